@@ -10,12 +10,17 @@ des Wellenpakets in Hoehe des Energieerwartungswertes geplottet.
 Fuer jeden Startpunkt wird die Norm der Differenz zwischen dem Anfangswellen-
 paket phi und dem aus den Entwicklungskoeffizienten c_n rekonstruierten Wellen-
 paket phi', also sqrt(|phi - phi'|^2), ausgegeben.
+Mit der Option -b ZIEL (und Startpunkt --x0) laeuft das Programm ohne Bild-
+schirm und speichert die Bilder als PNG-Folge (Verzeichnis) oder .npz-Datei.
 """
 
 import functools
+from optparse import OptionParser
 import numpy as np
 import matplotlib.pyplot as plt
 import quantenmechanik as qm
+import darstellung
+import zeitentwicklung as ze
 
 def wellenpaket(x, x_0, del_x, h_eff, p_0):
     """wellenpaket gibt das Gauss'sche Wellenpaket
@@ -44,14 +49,16 @@ def potential(x, A=0.15):
     """
     return x**4 - x**2 - A*x
 
-def linksklick(event, ew, ef, x, h_eff, del_x, p_0, faktor=0.01):
+def linksklick(event, ew, ef, x, h_eff, del_x, p_0, faktor=0.01, eps=1e-10):
     """linksklick plottet nach Linksklick der Maus die Zeitentwicklung eines
        Gauss'schen Wellenpaketes, wobei der mittlere Ort mittels des Linksklick
        festgelegt wird. Die Norm der Differenz des urspruenglichen Wellenpakets
        und des aus den Entwicklungskoeffizienten c_n rekonstruierten Paketes
        wird bei jeder geplotteten Zeitentwicklung mit ausgegeben. Der Skalier-
        ungsfaktor zur besseren Visualisierug ist standardmaessig auf 0.01 fest-
-       gelegt.
+       gelegt. Fuer die Zeitentwicklung werden nur die Eigenzustaende verwen-
+       det, die fuer eine Normgenauigkeit 1 - sum|c_n|^2 < eps noetig sind;
+       der Abschneidefehler wird ebenfalls ausgegeben.
 
        Parameter: ew:     sortierte Eigenwerte (Array der Laenge N)
                   ef:     entsprechende Eigenvektoren, ef[:, i]
@@ -61,6 +68,7 @@ def linksklick(event, ew, ef, x, h_eff, del_x, p_0, faktor=0.01):
                   del_x:  Breite des Gauss'schen Wellenpaketes
                   p_0:    mittlerer Impuls (fuer Wellenpaket)
                   faktor: Skalierungsfaktor fuer graphische Darstellung
+                  eps:    erlaubter Abschneidefehler der Eigenbasis
     """
     # Test, ob Klick mit linker Maustaste und im Koordinatensystem
     # erfolgt sowie ob Zoomfunktion des Plotfensters deaktiviert ist:
@@ -73,30 +81,94 @@ def linksklick(event, ew, ef, x, h_eff, del_x, p_0, faktor=0.01):
         # dukt, aber in ef eigentlich nur reelle Eintraege),
         # Eigenfunktionen sind spaltenweise in ef angeordnet:
         # -> Transponieren noetig, wegen Matrixmultiplikation (Zeilen * Vektor)
-        c = delta_x * np.dot(np.conjugate(np.transpose(ef)), phi_0)
+        c = ze.entwicklungskoeffizienten(ef, phi_0, delta_x)
         # mittels Koeffizienten rekonstruiertes phi' := phi_test:
         phi_test = np.dot(ef, c)
         # Norm der Differenz phi - phi' berechnen und auf Konsole ausgeben:
         print("Norm der Differenz =",np.sum(np.sqrt(abs(phi_test - phi_0)**2)))
+        # nur signifikant besetzte Eigenzustaende fuer Zeitentwicklung:
+        ew_k, ef_k, c_k, fehler = ze.basis_abschneiden(ew, ef, c, eps)
+        print("Abschneidefehler =", fehler, "mit", len(c_k), "von", len(c),
+              "Eigenzustaenden")
         # Energieerwartungswert <phi|H|phi> berechnen:
         energie = np.dot(abs(c)**2, ew)
         ax = plt.plot(x, abs(phi_0)**2)      # |phi_0|^2 plotten
         zeiten = np.linspace(0, 5, 100)      # Array mit betrachteten Zeiten
-        for t in zeiten:
-            # Konstruktion von phi(t):
-            phi_t = np.dot(np.conjugate(ef), c*np.exp((-1j*ew*t)/h_eff))
+        # Konstruktion von phi(t) fuer alle Zeiten auf einmal
+        # (ein Matrix-Matrix-Produkt statt einer Schleife ueber t):
+        phi_t = ze.zeitentwicklung(ew_k, ef_k, c_k, zeiten, h_eff)
+        ydaten = faktor*abs(phi_t)**2 + energie
+        # nur die Linie des Wellenpakets wird pro Bild neu gezeichnet
+        # (Blitting), der Rest der Figur bleibt als Hintergrund stehen:
+        animation = darstellung.BlitDarstellung(plt.gcf(), ax)
+        for j in range(len(zeiten)):
             # Zeitentwicklung des Betragsquadrates des Wellenpakets auf Hoehe
             # des Energieerwartungswertes plotten, dafuer mittels plt.setp
             # Daten immer neu setzen (dynamische Darstellung):
-            plt.setp(ax[0], ydata=faktor*abs(phi_t)**2 + energie)
-            plt.gcf().canvas.flush_events()
-            plt.draw()
+            plt.setp(ax[0], ydata=ydaten[:, j])
+            animation.aktualisieren()
+        animation.beenden()
         # Benutzerfuehrung:
         print("Mittels Linksklick neue Zeitentwicklung starten.")
 
+def bilddaten(ew, ef, x, h_eff, del_x, p_0, x_0, zeiten, ew_plot, ef_plot,
+              faktor=0.01, eps=1e-10):
+    """bilddaten berechnet wie linksklick die Zeitentwicklung des Gauss'schen
+       Wellenpakets mit Startpunkt x_0, gibt aber pro Zeit nur die zum
+       Zeichnen noetigen Daten als dict zurueck (Generator fuer den Batch-
+       Betrieb ohne Bildschirm, siehe bild_zeichnen).
+
+       Parameter: wie linksklick, zusaetzlich
+                  x_0:    mittlerer Ort des Startwellenpakets
+                  zeiten: Array mit betrachteten Zeiten
+                  ew_plot, ef_plot: dargestellte Eigenwerte und -funktionen
+    """
+    delta_x = x[1] - x[0]                # Ortsgitterabstand
+    phi_0 = wellenpaket(x, x_0, del_x, h_eff, p_0)
+    c = ze.entwicklungskoeffizienten(ef, phi_0, delta_x)
+    energie = np.dot(abs(c)**2, ew)      # Energieerwartungswert
+    ew_k, ef_k, c_k, _fehler = ze.basis_abschneiden(ew, ef, c, eps)
+    # nur die dargestellten Eigenfunktionen an die Zeichenprozesse geben:
+    ew_plot, ef_plot = np.array(ew_plot), np.array(ef_plot)
+    for zeiten_block, phi_block in ze.zeitentwicklung_bloecke(
+            ew_k, ef_k, c_k, zeiten, h_eff):
+        for t, phi_t in zip(zeiten_block, np.transpose(phi_block)):
+            yield {"t": t, "x": x, "ew": ew_plot, "ef": ef_plot,
+                   "ydaten": faktor*abs(phi_t)**2 + energie}
+
+def bild_zeichnen(figure, daten):
+    """bild_zeichnen zeichnet ein Bild der Zeitentwicklung aus den Daten von
+       bilddaten in die leere Figur figure (Batch-Betrieb).
+    """
+    ax = figure.add_subplot(111)
+    qm.plot_eigenfunktionen(ax, daten["ew"], daten["ef"], daten["x"],
+                            potential, betragsquadrat=True,
+                            title="Zeitentwicklung im asymmetrischen "
+                                  "Doppelmuldenpotential")
+    ax.plot(daten["x"], daten["ydaten"])
+    ax.text(0.98, 0.95, "t = {:.3f}".format(daten["t"]),
+            transform=ax.transAxes, ha="right", va="top")
+
 def main():
     """Hauptprogramm:"""
     print(__doc__)                   # Programmbeschreibung ausgeben
+    # Kommandozeile: mit -b/--batch laeuft das Programm ohne Bildschirm und
+    # speichert die Bilder (Verzeichnis fuer PNG-Folge oder Datei .npz):
+    parser = OptionParser()
+    parser.add_option("-b", "--batch", action="store", type="string",
+                      default=None, dest="ziel", metavar="ZIEL",
+                      help="Bilder ohne Bildschirm nach ZIEL schreiben")
+    parser.add_option("--x0", action="store", type="float", default=-0.7,
+                      dest="x_0", help="Startpunkt des Wellenpakets (Batch)")
+    parser.add_option("--tmax", action="store", type="float", default=5.0,
+                      dest="t_max", help="maximale Zeit (Batch)")
+    parser.add_option("--bilder", action="store", type="int", default=100,
+                      dest="bilder", help="Anzahl der Bilder (Batch)")
+    parser.add_option("-p", "--prozesse", action="store", type="int",
+                      default=None, dest="prozesse",
+                      help="Anzahl der Prozesse zum Rendern (Batch)")
+    options, _args = parser.parse_args()
+
     p_0 = 0.0                        # mittlerer Impuls
     h_eff = 0.07                     # dimensionsloses h_quer
     del_x = 0.1                      # delta_x im Gausspaket
@@ -105,13 +177,30 @@ def main():
     # diskretisierte Ortspunkte x  mit Hilfe von quantenmechanik.py berechnen:
     x = qm.diskretisierung(-l, l, N, retstep=False)
     # Eigenwerte und Eigenfunktion fuer asym. Doppelmuldenpotential mit Hilfe
-    # von quantenmechanik.py berechnen:
-    ew, ef = qm.diagonalisierung(h_eff, x, potential)
+    # von quantenmechanik.py berechnen (bei erneutem Start aus dem Disk-Cache):
+    ew, ef = qm.diagonalisierung_cache(h_eff, x, potential)
+    # fuer die Darstellung genuegen die Eigenfunktionen bis E_max = 0.15
+    # (Anzahl per Sturm-Folge, einfache Genauigkeit):
+    anz_plot = qm.anzahl_zustaende(h_eff, x, potential, 0.15)
+    ew_plot, ef_plot = qm.diagonalisierung_cache(h_eff, x, potential,
+                                                 anz=anz_plot,
+                                                 dtype=np.float32)
+
+    if options.ziel is not None:
+        zeiten = np.linspace(0, options.t_max, options.bilder)
+        anz = darstellung.bilder_exportieren(
+            bilddaten(ew, ef, x, h_eff, del_x, p_0, options.x_0, zeiten,
+                      ew_plot, ef_plot),
+            bild_zeichnen, options.ziel, prozesse=options.prozesse)
+        print(anz, "Bilder gespeichert in", options.ziel)
+        return
+
     plt.figure(0, figsize=(12,10))   # figure,
     ax = plt.subplot(111)            # subplot ax festlegen
     # mittels quantenmechnanik.py Betragsquadrate der Eigenfunktionen fuer asym
     # Doppelmuldenpotential bis Eigenenergien E_max = 0.15 plotten:
-    qm.plot_eigenfunktionen(ax, ew, ef, x, potential, betragsquadrat=True,
+    qm.plot_eigenfunktionen(ax, ew_plot, ef_plot, x, potential,
+                            betragsquadrat=True,
                             title="Zeitentwicklung im asymmetrischen "
                                   "Doppelmuldenpotential")
     # bei Linksklick der Maus im Plotbereich linksklick anwenden:
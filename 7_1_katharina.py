@@ -16,6 +16,8 @@ import functools
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.linalg import eigh
+import quantenmechanik as qm
+import periodisch
 
 def potential(x, A=1):
     """potential gibt das periodische Potential V(x) = A*cos(2*pi*x) mit De-
@@ -143,7 +145,8 @@ def plot_eigenfunktionen(ax, ew, ef, x, V, anz, width=1, Emax=0.15, fak=0.01,
             plt.plot(x, ew[i] + fak*ef[:, i], linewidth=width[i],
                      color=colors[i % len(colors)], alpha=alpha[i])
 
-def linksklick(event, ax1, ax2, h_eff, potential, x, E_max, n_per, a, b, anz):
+def linksklick(event, ax1, ax2, h_eff, potential, x, E_max, n_per, a, b, anz,
+               band_cache=None, k=None):
     """linksklick plottet nach Linksklick der Maus in Plotbereich ax1 die
        betragsquadrierten Eigenfunktionen und zugehoerigen -energien sowie das
        zugehoerige Potential fuer n_per Perioden in den Plotbereich ax2.
@@ -160,6 +163,14 @@ def linksklick(event, ax1, ax2, h_eff, potential, x, E_max, n_per, a, b, anz):
                   a:         untere Intervallgrenze fuer x
                   b:         obere Intervallgrenze fuer x
                   anz:       Anzahl der zu plottenden Eigenfunktion/-energien
+                  band_cache: dict fuer den Band-Cache (siehe
+                              periodisch.band_cache_laden); falls ange-
+                              geben, werden ew und ef daraus interpoliert
+                              statt bei jedem Klick neu diagonalisiert. Ein
+                              leeres dict wird beim ersten Klick fuer das
+                              k-Gitter k gefuellt (aus dem Disk-Cache oder
+                              einmalig berechnet)
+                  k:         k-Gitter des Band-Caches
     """
     # Test, ob Klick mit linker Maustaste und im Plotbereich ax1
     # erfolgt sowie ob Zoomfunktion des Plotfensters deaktiviert ist:
@@ -168,8 +179,15 @@ def linksklick(event, ax1, ax2, h_eff, potential, x, E_max, n_per, a, b, anz):
         ax2.lines = []      # Linien in ax2 loeschen
         # Berechnung ef und zugehoerige ew fuer Plot,
         # Wert fuer k mit Linksklick festgelegt:
-        ew_plot, ef_plot = diagonalisierung(h_eff, x, potential,
-                                            event.xdata)
+        if band_cache is not None:
+            if not band_cache:               # erster Klick: Cache fuellen
+                band_cache.update(periodisch.band_cache_laden(
+                    h_eff, x, potential, k, anz))
+            ew_plot, ef_plot = periodisch.band_cache_abfrage(band_cache,
+                                                             event.xdata)
+        else:
+            ew_plot, ef_plot = diagonalisierung(h_eff, x, potential,
+                                                event.xdata)
 
         # periodische Fortsetzung von x auf x_per (fuer n_per Perioden):
         x_per = x
@@ -178,10 +196,11 @@ def linksklick(event, ax1, ax2, h_eff, potential, x, E_max, n_per, a, b, anz):
         for i in np.arange(n_per-1) + 1:
             x_per = np.append(x_per, x + i*(b - a))
 
-        # periodische Fortsetzung der Eigenfunktionen, zugeh. EW und des Pot-
-        # tentials fuer n_per Perioden (ef_plot ist dabei Matrix):
-        ew_plot = np.tile(ew_plot, n_per)
-        ef_plot = np.tile(ef_plot, (n_per, n_per))
+        # periodische Fortsetzung der anz zu plottenden Eigenfunktionen (mit
+        # Bloch-Phase exp(i*k*n) in der n-ten Periode) und des Potentials
+        # fuer n_per Perioden:
+        ef_plot = periodisch.bloch_fortsetzung(ef_plot, event.xdata, n_per,
+                                               np.arange(anz))
         V_per = np.tile(potential(x), n_per)
         # plotten der betragsquadrierten ef im rechten Plotbereich ax2:
         plot_eigenfunktionen(ax2, ew_plot, ef_plot, x_per, V_per, anz,
@@ -212,16 +231,25 @@ def main():
     for i in np.arange(n_per-1) + 1:
         x_per = np.append(x_per, x + i*(b - a))
 
-    ew = np.zeros((N_k, N_x))               # "leere" (N_k)x(N_x)-Matrix für EW
-    # EW fuer alle k-Werte berechnen,
-    # in i-te Zeile der Matrix ew die N_x Eigenwerte zwischenspeichern:
-    for i in np.arange(N_k):
-        ew[i, :] = diagonalisierung(h_eff, x, potential, k[i])[0]
-
-    energien = ew[:, ew.min(0) < E_max]     # EW < E_max in Matrix energien
+    # Eigenwertspektrum (nur Baender mit Minimum < E_max) aus dem Disk-Cache
+    # laden (Schluessel aus Ortsgitter, h_eff, Stencil, Potentialwerten,
+    # k-Werten und E_max) oder parallel fuer alle k-Werte berechnen:
+    schluessel = qm.cache_schluessel("bandstruktur", qm.STENCIL, x,
+                                     np.float64(h_eff), potential(x), k,
+                                     np.float64(E_max))
+    gespeichert = qm.cache_laden(schluessel, ["energien"])
+    if gespeichert is not None:
+        energien = gespeichert[0]
+    else:
+        energien = periodisch.bandstruktur(h_eff, x, potential, k, E_max)
+        qm.cache_speichern(schluessel, {"energien": energien})
     # Anzahl der Spalten der Matrix energien entspricht Anzahl zu plottender
     # Eigenfunktionen und Energien im Eigenwertspektrum:
     anz = energien.shape[1]
+    # Eigenwerte und -vektoren der anz Baender auf dem k-Gitter werden erst
+    # beim ersten Klick berechnet (bzw. aus dem Disk-Cache geladen), danach
+    # werden Klicks ohne erneute Diagonalisierung beantwortet:
+    band_cache = {}
 
     colors = ['b', 'g', 'r', 'c', 'm', 'y'] # feste Farbreihenfolge fuer Plots
 
@@ -252,7 +280,8 @@ def main():
     klick_funktion = functools.partial(linksklick, h_eff=h_eff, a=a, anz=anz,
                                        ax1=ew_spektrum, ax2=betragsquadrat,
                                        potential=potential, n_per=n_per, x=x,
-                                       E_max=E_max, b=b)
+                                       E_max=E_max, b=b,
+                                       band_cache=band_cache, k=k)
     plt.connect('button_press_event', klick_funktion)
     plt.show()
 
@@ -7,35 +7,20 @@ die rechte Seitenflaeche eines Quaders im Zeitintervall delta_t=4 ausgeuebt
 wird, fuer R=10000 Realisierungen betrachtet und in einem Histogramm darge-
 stellt. Zusaetzlich wird der Erwartungswert und die Standardabweichung von p
 fuer die R Realisierungen ausgegeben und mit Hilfe dieser Werte eine normierte
-Gauss-Verteilung zum Vergleich im Histogramm mit dargestellt.
+Gauss-Verteilung zum Vergleich im Histogramm mit dargestellt. Ebenfalls
+eingezeichnet ist die semi-analytisch (ueber die charakteristische Funktion)
+berechnete Verteilung des Drucks.
+
+Mit der Option -s SEED ist die Rechnung reproduzierbar (unabhaengig von der
+mit -p gewaehlten Anzahl der Prozesse). Die Option -v vergleicht zusaetzlich
+Schaetzer fuer den Erwartungswert des Drucks mit Varianzreduktion.
 """
 
+from optparse import OptionParser
 import numpy as np
 import matplotlib.pyplot as plt
-
-def reflexionen(x_0, v, delta_t):
-    """reflexionen berechnet die Anzahl der Reflexionen an der rechten Wand.
-       Herleitung der Formel siehe *) in Diskussion.
-
-       Parameter: x_0:     Anfangsort des Teilchens
-                  v:       Geschwindigkeit des Teilchens
-                  delta_t: betrachtetes Zeitintervall
-    """
-    x_end = x_0 + v*delta_t
-    n = np.int32((abs(x_end) + 1)/2)    # int32 rundet auf int ab
-    return n
-
-def druck(N, delta_t, v, n):
-    """druck berechnet den Druck den ein Ensemble aus N Teilchen auf die rechte
-       Wand eines Quaders ausuebt. Dabei muss das Array der Geschwindigkeiten
-       passend zum  Array der Stoesse mit der rechten Wand sortiert sein.
-
-       Parameter: N:       Anzahl der Teilchen
-                  delta_t: betrachtetes Zeitintervall
-                  v:       Geschwindigkeiten der Teilchen
-                  n:       Stoesse der Teilchen mit der rechten Wand
-    """
-    return 2/(N*delta_t) * np.sum(abs(v)*n)
+import idealgas
+import montecarlo
 
 def gauss(mu, sigma, x):
     """gauss gibt die normierte Gauss-Verteilung (Dichtefunktion) zurueck.
@@ -48,44 +33,76 @@ def gauss(mu, sigma, x):
 
 def main():
     print(__doc__)          # Programmbeschreibung ausgeben
+    # Kommandozeile: Startwert des Zufallsgenerators und Anzahl der Prozesse:
+    parser = OptionParser()
+    parser.add_option("-s", "--seed", action="store", type="int",
+                      default=None, dest="seed",
+                      help="Startwert fuer reproduzierbare Ergebnisse")
+    parser.add_option("-p", "--prozesse", action="store", type="int",
+                      default=None, dest="prozesse",
+                      help="Anzahl der Prozesse")
+    parser.add_option("-v", "--varianzreduktion", action="store_true",
+                      default=False, dest="vergleich",
+                      help="Schaetzer mit Varianzreduktion vergleichen")
+    options, _args = parser.parse_args()
+
     N = 8                   # Anzahl der Teilchen
     R = 10000               # Anzahl der Realisierung
     delta_t = 4             # Zeitintervall
-    n = np.zeros((R, N))    # "leere" RxN-Matrix fuer Anzahl der Reflexionen
-    p = np.zeros(R)         # "leeres" Array fuer Druecke mit Laenge R
-    # Schleife ueber die R Realisierungen:
-    for i in np.arange(R):
-        # zufaellige Orte x (gleichverteilt) fuer N Teilchen zwischen 0 und 1:
-        x_0 = np.random.uniform(0, 1, size=N)
-        # zufaellige Geschwindigkeiten fuer die N Teilchen:
-        v = np.random.randn(N)
-        # Anzahl Reflex. fuer Realisierung i in i-ter Zeile von n speichern:
-        n[i, :] = reflexionen(x_0, v, delta_t)
-        p[i] = druck(N, delta_t, v, n[i])
-
-    # Mittelwert des Drucks berechnen und auf Konsole ausgeben:
-    p_mean = np.mean(p)
+
+    # Realisierungen blockweise vektorisiert erzeugen; es werden nur Mittel-
+    # wert, Varianz und ein Histogramm mit festen Bins mitgefuehrt, der
+    # Speicherbedarf haengt also nicht von R ab (auch R=10**9 moeglich):
+    # Binanzahl mittels Scott- (fuer R>200 i.A. zu wenig Bins) und Rice-Methode
+    # (i.A. zu viele Bins) berechnet und Mittelwert aus beiden genommen
+    # -> liefert opt. Binanzahl=28.69, muss aber int sein -> auf 30 aufgerundet
+    # (die Bins reichen bis zu dem Druck, der mit Wahrscheinlichkeit < 10**-4
+    # ueberschritten wird, also etwa bis zum Maximum von R=10000 Werten):
+    statistik = idealgas.druck_monte_carlo(N, R, delta_t, bins=30,
+                                           seed=options.seed,
+                                           prozesse=options.prozesse)
+    p_mean, sigma, dichte = montecarlo.statistik_auswerten(statistik)
+    print("Seed:", statistik["seed"])
+
+    # Mittelwert des Drucks auf Konsole ausgeben:
     print("Der Erwartungswert des Drucks beträgt:", p_mean)
-    # Standardabweichung des Drucks berechnen und auf Konsole ausgeben:
-    sigma = np.sqrt((1/(R - 1) * np.sum((p - p_mean)**2)))
+    # Standardabweichung des Drucks auf Konsole ausgeben:
     print("Die Standardabweichung des Drucks beträgt:",sigma)
+    # Werte ausserhalb der festen Bins (siehe idealgas.druck_obergrenze):
+    ausserhalb = statistik["unter"] + statistik["ueber"]
+    if ausserhalb > 0:
+        print("Werte ausserhalb des Histogramms:", ausserhalb)
+
+    if options.vergleich:
+        # Erwartungswert mit 2**20 Realisierungen pro Methode schaetzen;
+        # Faktor = Ersparnis an Realisierungen ggue. der einfachen Methode:
+        for methode in idealgas.METHODEN:
+            ergebnis = idealgas.druck_mittelwert(N, 2**20, delta_t, methode,
+                                                 seed=options.seed,
+                                                 prozesse=options.prozesse)
+            print("{:17s} <p> = {:.5f} +- {:.5f}   Faktor {:.2f}".format(
+                methode, ergebnis["mittel"], ergebnis["fehler"],
+                ergebnis["faktor"]))
 
     plt.figure(1, figsize=(12,10))
     plt.title("Wahrscheinlichkeitsverteilung Druck p")      # Titel,
-    plt.axis([0, p.max(), 0, 1])                            # Plot-
+    plt.axis([0, statistik["max"], 0, 1])                   # Plot-
     plt.xlabel("Druck p")                                   # bereich,
     plt.ylabel("Häufigkeit")                                # Labels definieren
 
-    # Binanzahl mittels Scott- (fuer R>200 i.A. zu wenig Bins) und Rice-Methode
-    # (i.A. zu viele Bins) berechnet und Mittelwert aus beiden genommen
-    # -> liefert opt. Binanzahl=28.69, muss aber int sein -> auf 30 aufgerundet
-    plt.hist(p, bins=30, normed=True, label="Wahrscheinlichkeitsverteilung")
-
-    # Druckwerte des Histogramm fuer Gauss-Verteilung wiederverwenden;
-    # p-Werte fuer Plot der Gauss-Verteilung erst sortieren und dann plotten:
-    p_sort = np.sort(p)
-    plt.plot(p_sort, gauss(p_mean, sigma, p_sort), ls="dashed", linewidth=2,
-             label="normierte Gauss-Verteilung")
+    kanten = statistik["kanten"]
+    plt.hist(kanten[:-1], bins=kanten, weights=dichte,
+             label="Wahrscheinlichkeitsverteilung")
+
+    # Gauss-Verteilung mit gleichem Mittelwert und gleicher Standardabw.:
+    p_gitter = np.linspace(0, statistik["max"], 400)
+    plt.plot(p_gitter, gauss(p_mean, sigma, p_gitter), ls="dashed",
+             linewidth=2, label="normierte Gauss-Verteilung")
+    # semi-analytische Verteilung (N-fache Faltung der Einteilchen-Verteilung
+    # ueber die charakteristische Funktion, Aufwand unabhaengig von N):
+    p_fft, dichte_fft = idealgas.druck_verteilung(N, delta_t)
+    plt.plot(p_fft, dichte_fft, c="r", linewidth=2,
+             label="semi-analytische Verteilung")
     plt.legend(loc="best")
     plt.show()
 
@@ -11,12 +11,27 @@ tion eingezeichnet. Fuer das Histogrammist zusaetzlich die theoretisch erwarte-
 te Verteilung im Fall mit Absorption zu sehen.
 
 Die Dynamik kann mittels Linksklick der Maus in einen der 4 Plotbereiche ge-
-startet werden.
+startet werden. Mit der Option -b ZIEL laeuft das Programm ohne Bildschirm
+und speichert die Bilder als PNG-Folge (Verzeichnis) oder .npz-Datei; die
+Realisierungen werden dann blockweise auf -p Prozesse verteilt. Mit -s SEED
+sind die Ergebnisse reproduzierbar (unabhaengig von der Anzahl der Prozesse).
+
+Die Teilchen werden exakt von t_n nach t_{n+1} propagiert, die Absorption
+am Rand wird dabei ueber die Treffwahrscheinlichkeit der Brownschen Bruecke
+bestimmt (siehe diffusion.py). Mit der Option -e wird stattdessen wie ur-
+spruenglich mit Euler-Schritten delta_t integriert. Mit -f werden die Bilder
+im Batch-Betrieb rauschfrei aus der Fokker-Planck-Gleichung berechnet.
 """
 
 import functools
+import os
+from optparse import OptionParser
 import numpy as np
 import matplotlib.pyplot as plt
+import darstellung
+import diffusion
+import erstpassage
+import montecarlo
 
 def gauss(x, mu, var):
     """gauss gibt die normierte Gauss-Verteilung (Dichtefunktion) zurueck.
@@ -35,129 +50,84 @@ def gauss(x, mu, var):
         gauss = (1/(np.sqrt(2*np.pi*var))) * np.exp(-(((x - mu)**2)/(2*var)))
     return gauss
 
-def linksklick(event, ax1, ax2, ax3, ax4, x_0, T_max, delta_t, R, D, v_drift,
-               x_abs):
-    """linksklick startet nach Linksklick der Maus in einen der Plotbereiche
-       axi (mit i=1,2,3,4) eine dynamische Zeitentwicklung der WSK-Dichte
-       P(x, t_n), der Norm, des Erwartungswertes und der Varianz der numerisch-
-       en Implemetation der Langevin-Gleichung zur Beschreibung einer gerichte-
-       ten Diffusion mit absorbierenden Rand. Dabei wird die Zeitentwicklung
-       fuer alle Zeitschritte delta_t ab t=0 berechnet, aber nur zu Zeiten
-       t_n=1, 2, 3... bis T_max dynamisch dargestellt. Zusaetzlich wird die
-       theoretische Vorhersage fuer den Fall ohne Abs. eingezeichnet.
+def langevin(x_0, T_max, delta_t, R, D, v_drift, x_abs, rng=None,
+             exakt=True):
+    """langevin integriert die Langevin-Gleichung der gerichteten Diffusion
+       und gibt zu den Zeiten t_n=0, 1, 2... bis T_max jeweils (t_n, x_t,
+       x_plot) zurueck (Generator). Dabei sind x_t die Orte aller R Reali-
+       sierungen (ohne Absorption) und x_plot die Orte der nicht absorbierten
+       Teilchen. Mit exakt=True wird pro Ausgabezeit ein exakter Schritt
+       gemacht und die Absorption ueber das Brueckenkriterium bestimmt,
+       sonst werden nur die Ueberlebenden mit Zeitschritten delta_t inte-
+       griert und ein Teilchen dauerhaft entfernt, sobald x >= x_abs ist
+       (x_t dann aus einem frei propagierten Ensemble).
 
-       Parameter: ax1:      Subplot fuer WSK-Dichte P(x, t_n)
-                  ax2:      Subplot fuer Norm
-                  ax3:      Subplot fuer Erwartungswert
-                  ax4:      Subplot fuer Varianz
-                  x_0:      Anfangsorte
+       Parameter: x_0:      Anfangsorte
                   T_max:    maximal betrachtete Zeit
                   delta_t:  Zeitschrittweite
                   R:        Anzahl d. Realisierungen
                   D:        Diffusionskonstante
                   v_drift:  Driftgeschwindigkeit
                   x_abs:    Position des absorbierenden Randes
+                  rng:      np.random.Generator (Default: neuer Generator)
+                  exakt:    exakte Schritte zwischen den Ausgabezeiten
     """
-    # Test, ob Klick mit linker Maustaste und im Koordinatensystem
-    # erfolgt sowie ob Zoomfunktion des Plotfensters deaktiviert ist:
-    mode = plt.get_current_fig_manager().toolbar.mode
-    if event.button == 1 and event.inaxes and mode == '':
-        x_t = x_0           # Startort zu t=0
-        # Array mit betrachteten Zeiten:
-        t = np.arange(0, T_max + delta_t, delta_t)
-        for i in t:
-            # nur Zeiten t_n = 1,2,3.. dynamsich darstellen:
-            if i % 1.0 == 0.0:
-                # neue Orte berechnen:
-                x_t = (x_t + v_drift*delta_t + np.sqrt(2*D*delta_t) *
-                       np.random.randn(R))
-                # nur Teilchen mit Orten kleiner als absorb. Rand betrachten:
-                x_plot = x_t[x_t < x_abs]
-                # Wichtung R(t_n)/R:
-                weight = np.ones(len(x_plot)) * (len(x_plot)/R)
-
-                # alte Histogrammdaten in Plotbereich ax1 loeschen:
-                ax1.patches = []
-                # neue Daten fuer Histogramm in ax1 plotten:
-                ax1.hist(x_plot, bins=30, normed=True, weights=weight,
-                         color="b")
-                # alte Plotdaten in Plotbereich ax1 loeschen:
-                ax1.lines = []
-                # rote vert. Linie des absorb. Randes an x_abs neueinzeichnen:
-                ax1.axvline(x=x_abs, ls="dashed", c="r",
-                            label="absorbierender Rand")
-                # theoretische WSK-Dichte fuer Fall ohne Absorption berechnen:
-                p_ohne_abs = gauss(x_t, x_0 + v_drift*i, 2*D*i)
-                # theor. WSK-Dichte fuer Fall mit Absorption berechnen, Teilen
-                # durch 0 vermeiden, falls Div. durch 0 WSK auf 0 setzen:
-                try:
-                    p_mit_abs = (gauss(x_t, x_0 + v_drift*i, 2*D*i) -
-                                 gauss(x_t, 2*x_abs - x_0 + v_drift*i, 2*D*i) *
-                                (gauss(x_abs, x_0 + v_drift*i, 2*D*i) /
-                                 gauss(x_abs, 2*x_abs-x_0 + v_drift*i, 2*D*i)))
-                except ZeroDivisionError:
-                    p_mit_abs = np.zeros(len(x_t))
-
-                # nur einmal Legendeneintraege f. dynam. Darstellung plotten
-                # -> seperate Behandlung von Startzeit t=0:
-                if i == 0.0:
-                    ax1.plot(x_t, p_ohne_abs, ls="", marker="o", ms=1.2, c="k",
-                             label="theoretische Erwartung ohne Absorption")
-                    ax1.plot(x_t, p_mit_abs, c="y", ls="", marker="o",ms=0.8,
-                             label="theoretische Erwartung mit Absorption")
-                    ax2.plot(i, len(x_t)/R, c="k", marker="o", ms=2,
-                             label="ohne Absorption")
-                    ax2.plot(i, len(x_plot)/R, c="c", marker="o", ms=2,
-                             label="mit Absorption")
-                    ax3.plot(i, np.mean(x_t), c="k", marker="o", ms=2,
-                             label="ohne Absorption")
-                    ax3.plot(i, np.mean(x_plot), c="g", marker="o", ms=2,
-                             label="mit Absorption")
-                    ax4.plot(i, np.var(x_t, ddof=1), c="k", marker="o", ms=2,
-                             label="ohne Absorption")
-                    ax4.plot(i, np.var(x_plot, ddof=1), c="m", marker="o",ms=2,
-                             label="mit Absorption")
-                # Plotbefehle zu Zeiten t groesser 0 und t % 1.0 == 0.0:
-                else:
-                    ax1.plot(x_t, p_ohne_abs, ls="", marker="o", ms=1.2, c="k",
-                             label="theoretische Erwartung ohne Absorption")
-                    ax1.plot(x_t, p_mit_abs, c="y", ls="", marker="o", ms=0.8,
-                             label="theoretische Erwartung mit Absorption")
-                    ax2.plot(i, len(x_t)/R, c="k", marker="o", ms=2)
-                    ax2.plot(i, len(x_plot)/R, c="c", marker="o", ms=2)
-                    ax3.plot(i, np.mean(x_t), c="k", marker="o", ms=2)
-                    ax3.plot(i, np.mean(x_plot), c="g", marker="o", ms=2)
-                    ax4.plot(i, np.var(x_t, ddof=1), c="k", marker="o", ms=2)
-                    ax4.plot(i, np.var(x_plot, ddof=1), c="m", marker="o",ms=2)
-                # Legendeneintraege anzeigen und links oben fixieren:
-                ax1.legend(loc="upper left")
-                ax2.legend(loc="upper left")
-                ax3.legend(loc="upper left")
-                ax4.legend(loc="upper left")
-
-                plt.gcf().canvas.flush_events()
-                plt.draw()
-            # fuer alle anderen Zeitschritte delta_t die x_t berechnen,
-            # aber nichts plotten:
-            else:
-                x_t = (x_t + v_drift*delta_t + np.sqrt(2*D*delta_t) *
-                       np.random.randn(R))
+    if rng is None:
+        rng = np.random.default_rng()
+    t_n, _schritte = diffusion.ausgabezeiten(T_max, delta_t)
+    frei = diffusion.driftdiffusion_exakt(x_0, t_n, D, v_drift, x_abs, rng)
+    if exakt:
+        for i, x_t, lebendig in frei:
+            yield i, x_t, x_t[lebendig]
+        return
+    # absorbierte Teilchen werden dauerhaft entfernt (kein Zurueckwandern),
+    # der Aufwand skaliert mit der Zahl der Ueberlebenden:
+    absorbierend = diffusion.absorbierende_diffusion(
+        x_0, t_n, D, v_drift, x_abs, delta_t, rng, bruecke=False)
+    for (i, x_t, _lebendig), (_i, x_plot, _t_abs) in zip(frei, absorbierend):
+        yield i, x_t, x_plot
 
-def main():
-    print(__doc__)      # Programmbeschriebung ausgeben
-    T_max = 40          # maximale Zeit
-    R = 10000           # Anzahl der Realisierungen
-    x_0 = np.zeros(R)   # Anfangsort fuer R Realisierungen
-    v_drift = 0.1       # Driftgeschwindigkeit
-    D = 1.5             # Diffusionskonstante
-    x_abs = 15          # Position absorbierender Rand
-    delta_t = 0.01      # Zeitschrittweite
+def theorie(x, t, x_0, D, v_drift, x_abs):
+    """theorie gibt die theoretischen WSK-Dichten ohne und mit Absorption
+       (p_ohne_abs, p_mit_abs) an den Orten x zur Zeit t zurueck.
 
-    # figure anlegen und Ueberschrift festlegen:
-    figure = plt.figure(0, figsize=(14,10))
+       Parameter: x:        Orte
+                  t:        Zeit
+                  x_0:      Anfangsort(e)
+                  D:        Diffusionskonstante
+                  v_drift:  Driftgeschwindigkeit
+                  x_abs:    Position des absorbierenden Randes
+    """
+    # zur Zeit t=0 ist die Dichte eine Delta-Funktion bei x_0 (Varianz 0),
+    # die sich nicht auswerten laesst -> beide Dichten auf 0 setzen:
+    if t == 0:
+        return np.zeros(np.shape(x)), np.zeros(np.shape(x))
+    # theoretische WSK-Dichte fuer Fall ohne Absorption berechnen:
+    p_ohne_abs = gauss(x, x_0 + v_drift*t, 2*D*t)
+    # theor. WSK-Dichte fuer Fall mit Absorption berechnen, Teilen
+    # durch 0 vermeiden, falls Div. durch 0 WSK auf 0 setzen:
+    try:
+        p_mit_abs = (gauss(x, x_0 + v_drift*t, 2*D*t) -
+                     gauss(x, 2*x_abs - x_0 + v_drift*t, 2*D*t) *
+                    (gauss(x_abs, x_0 + v_drift*t, 2*D*t) /
+                     gauss(x_abs, 2*x_abs-x_0 + v_drift*t, 2*D*t)))
+    except ZeroDivisionError:
+        p_mit_abs = np.zeros(len(x))
+    return p_ohne_abs, p_mit_abs
+
+def achsen_einrichten(figure, T_max, x_abs, ueberleben=None):
+    """achsen_einrichten legt in figure die 4 Plotbereiche fuer WSK-Dichte,
+       Norm, Erwartungswert und Varianz an und gibt sie zurueck.
+
+       Parameter: figure:     Matplotlib-Figur
+                  T_max:      maximal betrachtete Zeit
+                  x_abs:      Position des absorbierenden Randes
+                  ueberleben: (t, S) der theoretischen Norm mit Absorption
+                              (Ueberlebensfunktion, siehe erstpassage.py)
+    """
     figure.suptitle("Diffusion mit Drift und Absorption", fontsize=18)
     # subplot ax1 fuer Wahrscheinlichkeitsdichte P(x, t_n):
-    ax1 = plt.subplot(221)
+    ax1 = figure.add_subplot(221)
     # rot gestrichelte, vertikale Linie an Stelle des absorbierenden Randes:
     ax1.axvline(x=x_abs, ls="dashed", c="r", label="absorbierender Rand")
     ax1.set_xlim([-20, 20])                                     # Plot-
@@ -169,16 +139,19 @@ def main():
     ax1.set_autoscale_on(False)
 
     # subplot ax2 fuer Norm:
-    ax2 = plt.subplot(222)
+    ax2 = figure.add_subplot(222)
     ax2.set_xlim([0, T_max])                                    # Plot-
     ax2.set_ylim([0, 2])                                        # bereich,
     ax2.set_title("Norm $R(t_{n})/R$")                          # Titel,
     ax2.set_xlabel("t")                                         # Labels
     ax2.set_ylabel("$R(t_{n})/R$")                              # definieren
+    if ueberleben is not None:
+        ax2.plot(*ueberleben, c="c", lw=0.8,
+                 label="theoretische Norm mit Absorption")
     ax2.set_autoscale_on(False)
 
     # subplot ax3 fuer Erwartungswert:
-    ax3 = plt.subplot(223)
+    ax3 = figure.add_subplot(223)
     ax3.set_xlim([0, T_max])                                    # Plot-
     ax3.set_ylim([0, 5])                                        # bereich,
     ax3.set_title("Erwartungswert $\mu$")                       # Titel,
@@ -187,19 +160,294 @@ def main():
     ax3.set_autoscale_on(False)
 
     # subplot ax4 fuer Varianz:
-    ax4 = plt.subplot(224)
+    ax4 = figure.add_subplot(224)
     ax4.set_xlim([0, T_max])                                    # Plot-
     ax4.set_ylim([0, 125])                                      # bereich,
     ax4.set_title("Varianz $\sigma^{2}$")                       # Titel,
     ax4.set_xlabel("t")                                         # Labels
     ax4.set_ylabel("$\sigma^{2}$")                              # definieren
     ax4.set_autoscale_on(False)
+    return ax1, ax2, ax3, ax4
+
+def zeitreihen_anlegen(ax2, ax3, ax4):
+    """zeitreihen_anlegen legt die (leeren) Linien fuer Norm, Erwartungswert
+       und Varianz jeweils ohne und mit Absorption an und gibt sie zurueck.
+    """
+    return [ax2.plot([], [], c="k", ls="", marker="o", ms=2,
+                     label="ohne Absorption")[0],
+            ax2.plot([], [], c="c", ls="", marker="o", ms=2,
+                     label="mit Absorption")[0],
+            ax3.plot([], [], c="k", ls="", marker="o", ms=2,
+                     label="ohne Absorption")[0],
+            ax3.plot([], [], c="g", ls="", marker="o", ms=2,
+                     label="mit Absorption")[0],
+            ax4.plot([], [], c="k", ls="", marker="o", ms=2,
+                     label="ohne Absorption")[0],
+            ax4.plot([], [], c="m", ls="", marker="o", ms=2,
+                     label="mit Absorption")[0]]
+
+def kenngroessen(x_t, x_plot, R):
+    """kenngroessen gibt Norm, Erwartungswert und Varianz jeweils ohne und
+       mit Absorption als Liste zurueck (Reihenfolge wie zeitreihen_anlegen).
+    """
+    return [len(x_t)/R, len(x_plot)/R,
+            np.mean(x_t), np.mean(x_plot),
+            np.var(x_t, ddof=1), np.var(x_plot, ddof=1)]
+
+def linksklick(event, ax1, ax2, ax3, ax4, x_0, T_max, delta_t, R, D, v_drift,
+               x_abs, seed=None, exakt=True):
+    """linksklick startet nach Linksklick der Maus in einen der Plotbereiche
+       axi (mit i=1,2,3,4) eine dynamische Zeitentwicklung der WSK-Dichte
+       P(x, t_n), der Norm, des Erwartungswertes und der Varianz der numerisch-
+       en Implemetation der Langevin-Gleichung zur Beschreibung einer gerichte-
+       ten Diffusion mit absorbierenden Rand. Dabei wird die Zeitentwicklung
+       fuer alle Zeitschritte delta_t ab t=0 berechnet, aber nur zu Zeiten
+       t_n=1, 2, 3... bis T_max dynamisch dargestellt. Zusaetzlich wird die
+       theoretische Vorhersage fuer den Fall ohne Abs. eingezeichnet.
+
+       Parameter: ax1:      Subplot fuer WSK-Dichte P(x, t_n)
+                  ax2:      Subplot fuer Norm
+                  ax3:      Subplot fuer Erwartungswert
+                  ax4:      Subplot fuer Varianz
+                  x_0:      Anfangsorte
+                  T_max:    maximal betrachtete Zeit
+                  delta_t:  Zeitschrittweite
+                  R:        Anzahl d. Realisierungen
+                  D:        Diffusionskonstante
+                  v_drift:  Driftgeschwindigkeit
+                  x_abs:    Position des absorbierenden Randes
+                  seed:     Startwert des Zufallsgenerators (None: zufaellig)
+                  exakt:    exakte Schritte (sonst Euler-Schritte delta_t)
+    """
+    # Test, ob Klick mit linker Maustaste und im Koordinatensystem
+    # erfolgt sowie ob Zoomfunktion des Plotfensters deaktiviert ist:
+    mode = plt.get_current_fig_manager().toolbar.mode
+    if event.button == 1 and event.inaxes and mode == '':
+        # alte Histogramm- und Plotdaten in Plotbereich ax1 loeschen und
+        # rote vert. Linie des absorb. Randes an x_abs neueinzeichnen:
+        for objekt in list(ax1.patches) + list(ax1.lines):
+            objekt.remove()
+        ax1.axvline(x=x_abs, ls="dashed", c="r", label="absorbierender Rand")
+        # veraenderliche Objekte einmalig anlegen, pro Bild werden nur ihre
+        # Daten ersetzt (Histogrammbalken, theor. Kurven, Zeitreihen):
+        balken = darstellung.histogramm_balken(ax1, 30, color="b")
+        ohne_abs, = ax1.plot([], [], ls="", marker="o", ms=1.2, c="k",
+                             label="theoretische Erwartung ohne Absorption")
+        mit_abs, = ax1.plot([], [], c="y", ls="", marker="o", ms=0.8,
+                            label="theoretische Erwartung mit Absorption")
+        reihen = zeitreihen_anlegen(ax2, ax3, ax4)
+        # Legendeneintraege einmalig anzeigen und links oben fixieren:
+        ax1.legend(loc="upper left")
+        ax2.legend(loc="upper left")
+        ax3.legend(loc="upper left")
+        ax4.legend(loc="upper left")
+        animation = darstellung.BlitDarstellung(plt.gcf(), balken +
+                                                [ohne_abs, mit_abs] + reihen)
+        t_n = []                                 # dargestellte Zeiten
+        werte = [[] for _reihe in reihen]        # Werte der Zeitreihen
+
+        rng = np.random.default_rng(seed)
+        for i, x_t, x_plot in langevin(x_0, T_max, delta_t, R, D, v_drift,
+                                       x_abs, rng, exakt):
+            # Wichtung R(t_n)/R:
+            weight = np.ones(len(x_plot)) * (len(x_plot)/R)
+            # neue Daten fuer Histogramm in ax1 setzen:
+            hoehen, kanten = np.histogram(x_plot, bins=30, density=True,
+                                          weights=weight)
+            darstellung.histogramm_setzen(balken, hoehen, kanten)
+            # theoretische WSK-Dichten ohne und mit Absorption:
+            # bei t=0 (Delta-Funktion) keine Theoriekurve zeichnen:
+            if i == 0:
+                ohne_abs.set_data([], [])
+                mit_abs.set_data([], [])
+            else:
+                p_ohne_abs, p_mit_abs = theorie(x_t, i, x_0, D, v_drift,
+                                                x_abs)
+                ohne_abs.set_data(x_t, p_ohne_abs)
+                mit_abs.set_data(x_t, p_mit_abs)
+
+            # Norm, Erwartungswert und Varianz an Zeitreihen anhaengen:
+            t_n.append(i)
+            for reihe, wert, liste in zip(reihen, kenngroessen(x_t, x_plot, R),
+                                          werte):
+                liste.append(wert)
+                reihe.set_data(t_n, liste)
+
+            animation.aktualisieren()
+        animation.beenden()
+
+def reihen_monte_carlo(x_0, T_max, delta_t, R, D, v_drift, x_abs, kanten,
+                       seed=None, prozesse=None, exakt=True):
+    """reihen_monte_carlo simuliert die R Realisierungen blockweise und
+       reproduzierbar auf mehreren Prozessen und liefert fortlaufend (sobald
+       ein Zeitabschnitt fertig ist) pro Ausgabezeit t_n die Histogramm-
+       hoehen der Ueberlebenden (feste Bin-Kanten) und die 6 Werte der
+       Zeitreihen (Reihenfolge wie kenngroessen).
+    """
+    t_n, statistiken, entropie = diffusion.langevin_statistik_fortlaufend(
+        x_0, T_max, delta_t, R, D, v_drift, x_abs, kanten, seed=seed,
+        prozesse=prozesse, exakt=exakt)
+    print("Seed:", entropie)
+    for t, (alle, ueberlebende) in zip(t_n, statistiken):
+        mu_ohne, sigma_ohne, _dichte = montecarlo.statistik_auswerten(alle)
+        mu_mit, sigma_mit, dichte = montecarlo.statistik_auswerten(
+            ueberlebende)
+        yield t, dichte, [alle["n"]/R, ueberlebende["n"]/R, mu_ohne, mu_mit,
+                          sigma_ohne**2, sigma_mit**2]
+
+def reihen_fokker_planck(x_0, T_max, delta_t, D, v_drift, x_abs, kanten,
+                         M=2000):
+    """reihen_fokker_planck berechnet dieselben Groessen wie
+       reihen_monte_carlo rauschfrei aus der Fokker-Planck-Gleichung (mit
+       absorbierendem Rand bzw. mit weit entferntem Rand fuer den Fall ohne
+       Absorption) und gibt sie ebenso pro Ausgabezeit zurueck. Die
+       Histogrammhoehen sind die Mittelwerte der auf die Ueberlebenden
+       normierten Dichte ueber die Bins.
+
+       Parameter: wie reihen_monte_carlo, zusaetzlich
+                  M: Anzahl der Zellen
+    """
+    t_n, _schritte = diffusion.ausgabezeiten(T_max, delta_t)
+    breite = 10*np.sqrt(2*D*T_max)
+    x_min = x_0 + min(0, v_drift*T_max) - breite
+    x_max = x_0 + max(0, v_drift*T_max) + breite
+    mit = diffusion.fokker_planck(x_min, x_abs, M, t_n, D, v_drift, x_0)
+    ohne = diffusion.fokker_planck(x_min, x_max, M, t_n, D, v_drift, x_0)
+    # Wahrscheinlichkeit links der Zellgrenzen, an den Bin-Kanten auswerten:
+    h = mit["x"][1] - mit["x"][0]
+    grenzen = np.append(mit["x"] - h/2, x_abs)
+    masse = np.cumsum(np.pad(mit["P"], ((0, 0), (1, 0))), axis=1)*h
+    hoehen = [np.diff(np.interp(kanten, grenzen, m))/np.diff(kanten)/norm
+              for m, norm in zip(masse, mit["norm"])]
+    reihen = np.transpose([ohne["norm"], mit["norm"], ohne["mittel"],
+                           mit["mittel"], ohne["varianz"], mit["varianz"]])
+    return zip(t_n, hoehen, reihen.tolist())
+
+def bilddaten(x_0, T_max, delta_t, R, D, v_drift, x_abs, seed=None,
+              prozesse=None, exakt=True, fokker_planck=False):
+    """bilddaten simuliert wie linksklick, gibt aber pro Zeit t_n nur die
+       zum Zeichnen noetigen Daten als dict zurueck (Generator fuer den
+       Batch-Betrieb ohne Bildschirm, siehe bild_zeichnen). Die Realisier-
+       ungen werden dabei blockweise und reproduzierbar auf mehrere Prozesse
+       verteilt; das Histogramm hat daher feste Bins zwischen -20 und x_abs.
+       Die Daten eines Bildes werden geliefert, sobald der Zeitabschnitt
+       simuliert ist, die Bilder koennen also parallel zur weiteren Simu-
+       lation gezeichnet werden.
+       Mit fokker_planck=True werden die Groessen stattdessen aus der Fokker-
+       Planck-Gleichung berechnet. Die theoretischen Kurven werden auf einem
+       festen Ortsgitter ausgewertet.
+
+       Parameter: wie linksklick, zusaetzlich
+                  prozesse:      Anzahl der Prozesse fuer die Simulation
+                  fokker_planck: Fokker-Planck-Loeser statt Realisierungen
+    """
+    x_theorie = np.linspace(-20, 20, 400)
+    kanten = np.linspace(-20, x_abs, 31)
+    t_theorie = np.linspace(0, T_max, 400)
+    ueberleben = (t_theorie, erstpassage.ueberleben(t_theorie, np.mean(x_0),
+                                                    x_abs, D, v_drift))
+    if fokker_planck:
+        reihen = reihen_fokker_planck(np.mean(x_0), T_max, delta_t, D,
+                                      v_drift, x_abs, kanten)
+    else:
+        reihen = reihen_monte_carlo(np.mean(x_0), T_max, delta_t, R, D,
+                                    v_drift, x_abs, kanten, seed=seed,
+                                    prozesse=prozesse, exakt=exakt)
+    t_n = []
+    werte = [[] for _i in range(6)]
+    for t, hoehen, neu in reihen:
+        t_n.append(t)
+        for liste, wert in zip(werte, neu):
+            liste.append(wert)
+        p_ohne_abs, p_mit_abs = theorie(x_theorie, t, np.mean(x_0), D,
+                                        v_drift, x_abs)
+        yield {"T_max": T_max, "x_abs": x_abs, "hoehen": hoehen,
+               "kanten": kanten, "x": x_theorie, "p_ohne_abs": p_ohne_abs,
+               "p_mit_abs": p_mit_abs, "t_n": list(t_n),
+               "werte": [list(liste) for liste in werte],
+               "ueberleben": ueberleben}
+
+def bild_zeichnen(figure, daten):
+    """bild_zeichnen zeichnet ein Bild der Dynamik aus den Daten von
+       bilddaten in die leere Figur figure (Batch-Betrieb).
+    """
+    ax1, ax2, ax3, ax4 = achsen_einrichten(figure, daten["T_max"],
+                                           daten["x_abs"],
+                                           daten["ueberleben"])
+    ax1.hist(daten["kanten"][:-1], bins=daten["kanten"],
+             weights=daten["hoehen"], color="b")
+    ax1.plot(daten["x"], daten["p_ohne_abs"], c="k",
+             label="theoretische Erwartung ohne Absorption")
+    ax1.plot(daten["x"], daten["p_mit_abs"], c="y",
+             label="theoretische Erwartung mit Absorption")
+    for reihe, liste in zip(zeitreihen_anlegen(ax2, ax3, ax4),
+                            daten["werte"]):
+        reihe.set_data(daten["t_n"], liste)
+    for ax in (ax1, ax2, ax3, ax4):
+        ax.legend(loc="upper left")
+    ax1.text(0.98, 0.95, "t = {:g}".format(daten["t_n"][-1]),
+             transform=ax1.transAxes, ha="right", va="top")
+
+def main():
+    print(__doc__)      # Programmbeschriebung ausgeben
+    # Kommandozeile: mit -b/--batch laeuft das Programm ohne Bildschirm und
+    # speichert die Bilder (Verzeichnis fuer PNG-Folge oder Datei .npz):
+    parser = OptionParser()
+    parser.add_option("-b", "--batch", action="store", type="string",
+                      default=None, dest="ziel", metavar="ZIEL",
+                      help="Bilder ohne Bildschirm nach ZIEL schreiben")
+    parser.add_option("-p", "--prozesse", action="store", type="int",
+                      default=None, dest="prozesse",
+                      help="Anzahl der Prozesse (Batch)")
+    parser.add_option("-s", "--seed", action="store", type="int",
+                      default=None, dest="seed",
+                      help="Startwert fuer reproduzierbare Ergebnisse")
+    parser.add_option("-e", "--euler", action="store_false", default=True,
+                      dest="exakt",
+                      help="Euler-Schritte delta_t statt exakter Schritte")
+    parser.add_option("-f", "--fokker-planck", action="store_true",
+                      default=False, dest="fokker_planck",
+                      help="Fokker-Planck-Loeser statt Realisierungen (Batch)")
+    options, _args = parser.parse_args()
+
+    T_max = 40          # maximale Zeit
+    R = 10000           # Anzahl der Realisierungen
+    x_0 = np.zeros(R)   # Anfangsort fuer R Realisierungen
+    v_drift = 0.1       # Driftgeschwindigkeit
+    D = 1.5             # Diffusionskonstante
+    x_abs = 15          # Position absorbierender Rand
+    delta_t = 0.01      # Zeitschrittweite
+
+    if options.ziel is not None:
+        # Simulation und Zeichnen laufen gleichzeitig: die Prozesse werden
+        # zwischen beiden Pools aufgeteilt:
+        prozesse = options.prozesse or os.cpu_count() or 1
+        simulation = max(prozesse//2, 1)
+        anz = darstellung.bilder_exportieren(
+            bilddaten(x_0, T_max, delta_t, R, D, v_drift, x_abs,
+                      seed=options.seed, prozesse=simulation,
+                      exakt=options.exakt,
+                      fokker_planck=options.fokker_planck),
+            bild_zeichnen, options.ziel,
+            prozesse=max(prozesse - simulation, 1), figsize=(14, 10))
+        print(anz, "Bilder gespeichert in", options.ziel)
+        return
+
+    # figure anlegen, Plotbereiche einrichten:
+    figure = plt.figure(0, figsize=(14,10))
+    # theoretische Norm mit Absorption = Ueberlebensfunktion der Erst-
+    # passagezeit zum Rand (inverse Gauss-Verteilung):
+    t_theorie = np.linspace(0, T_max, 400)
+    ax1, ax2, ax3, ax4 = achsen_einrichten(
+        figure, T_max, x_abs, (t_theorie, erstpassage.ueberleben(
+            t_theorie, np.mean(x_0), x_abs, D, v_drift)))
 
     # bei Linksklick der Maus im Plotbereich linksklick anwenden:
     klick_funktion = functools.partial(linksklick, ax1=ax1, ax2=ax2, ax3=ax3,
                                        ax4=ax4, x_0=x_0, D=D, R=R, T_max=T_max,
                                        delta_t=delta_t, v_drift=v_drift,
-                                       x_abs=x_abs)
+                                       x_abs=x_abs, seed=options.seed,
+                                       exakt=options.exakt)
     plt.connect("button_press_event", klick_funktion)
     plt.show()
 
@@ -0,0 +1,188 @@
+"""Schnelle dynamische Darstellung mit Matplotlib.
+
+Interaktiv (Blitting): Statt pro Bild die ganze Figur neu zu zeichnen, werden
+die veraenderlichen Objekte (Linien, Histogrammbalken) einmal angelegt, ihre
+Daten in jedem Bild nur ersetzt und ausschliesslich diese Objekte ueber einen
+gespeicherten Hintergrund gezeichnet.
+
+Ohne Bildschirm (Batch-Betrieb): Die Bilder werden mit dem Agg-Backend in
+Hintergrundprozessen gerendert und als PNG-Folge oder als komprimierter
+.npz-Bilderstapel gespeichert (jedes Bild sofort), waehrend der Hauptprozess
+weiter simuliert.
+"""
+
+import contextlib
+import multiprocessing
+import os
+import time
+import zipfile
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+class BlitDarstellung:
+    """Blitting-Animation fuer eine feste Menge veraenderlicher Objekte.
+
+    Parameter:
+        fig: Matplotlib-Figur
+        objekte: Liste der Artists (Linien, Rechtecke, ...), deren Daten sich
+            von Bild zu Bild aendern
+        max_fps: obere Grenze fuer die Bildrate (None: unbegrenzt)
+    """
+
+    def __init__(self, fig, objekte, max_fps=30):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.objekte = list(objekte)
+        self.min_abstand = 0.0 if max_fps is None else 1.0/max_fps
+        self.letztes_bild = 0.0
+        self.hintergrund = None
+        self.blit = getattr(self.canvas, "supports_blit", False)
+
+        for objekt in self.objekte:
+            objekt.set_animated(True)
+        # Hintergrund nach jedem vollstaendigen Neuzeichnen (z.B. Zoom,
+        # Groessenaenderung) neu speichern:
+        self.verbindung = self.canvas.mpl_connect("draw_event",
+                                                  self._hintergrund_speichern)
+        self.canvas.draw()
+
+    def _hintergrund_speichern(self, _event=None):
+        """Speichere alles ausser den veraenderlichen Objekten."""
+        if self.blit:
+            self.hintergrund = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._objekte_zeichnen()
+
+    def _objekte_zeichnen(self):
+        for objekt in self.objekte:
+            self.fig.draw_artist(objekt)
+
+    def aktualisieren(self):
+        """Zeichne die veraenderlichen Objekte neu (mit Bildratenbegrenzung).
+        """
+        warten = self.letztes_bild + self.min_abstand - time.perf_counter()
+        if warten > 0:
+            time.sleep(warten)
+
+        if self.blit and self.hintergrund is not None:
+            self.canvas.restore_region(self.hintergrund)
+            self._objekte_zeichnen()
+            self.canvas.blit(self.fig.bbox)
+        else:                                # Backend ohne Blitting
+            self.canvas.draw_idle()
+        self.canvas.flush_events()
+        self.letztes_bild = time.perf_counter()
+
+    def beenden(self):
+        """Beende die Animation; die Objekte bleiben normal sichtbar."""
+        self.canvas.mpl_disconnect(self.verbindung)
+        for objekt in self.objekte:
+            objekt.set_animated(False)
+        self.canvas.draw_idle()
+
+
+def histogramm_balken(ax, anz_bins, **kwargs):
+    """Lege die Balken eines Histogramms einmalig (mit Hoehe 0) an.
+
+    Parameter:
+        ax: Plotbereich
+        anz_bins: Anzahl der Balken
+        kwargs: weitere Argumente fuer ax.bar (z.B. color)
+    Rueckgabe:
+        balken: Liste der Rechtecke
+    """
+    return list(ax.bar(np.arange(anz_bins), np.zeros(anz_bins), width=1.0,
+                       align="edge", **kwargs))
+
+
+def histogramm_setzen(balken, hoehen, kanten):
+    """Setze Hoehen und Lage der Histogrammbalken (ohne neue Objekte).
+
+    Parameter:
+        balken: Rechtecke aus `histogramm_balken`
+        hoehen: neue Balkenhoehen (z.B. aus np.histogram)
+        kanten: Bin-Kanten (Laenge len(hoehen) + 1)
+    """
+    for rechteck, hoehe, links, rechts in zip(balken, hoehen, kanten[:-1],
+                                              kanten[1:]):
+        rechteck.set_x(links)
+        rechteck.set_width(rechts - links)
+        rechteck.set_height(hoehe)
+
+
+def _bild_rendern(zeichnen, daten, pfad, figsize, dpi):
+    """Rendere ein Bild ohne Bildschirm (Agg) in einem Arbeitsprozess.
+
+    Rueckgabe: None, falls unter `pfad` gespeichert wurde, sonst das Bild als
+    RGB-Array (Hoehe*Breite*3, uint8)
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    zeichnen(fig, daten)
+    if pfad is not None:
+        fig.savefig(pfad)
+        return None
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+
+
+def bilder_exportieren(bilddaten, zeichnen, ziel, prozesse=None,
+                       figsize=(12, 10), dpi=100):
+    """Rendere Bilder ohne Bildschirm parallel und speichere sie.
+
+    Der Hauptprozess erzeugt die Daten (z.B. durch eine laufende Simulation)
+    und gibt sie an einen Pool von Arbeitsprozessen weiter, die die Bilder
+    mit dem Agg-Backend rendern. Es sind hoechstens 2*prozesse Bilder gleich-
+    zeitig in Bearbeitung, und jedes fertige Bild wird sofort geschrieben
+    (auch in die .npz-Datei), der Speicherbedarf bleibt also begrenzt.
+
+    Parameter:
+        bilddaten: iterierbares Objekt (z.B. Generator) mit den Daten je Bild
+        zeichnen: Funktion zeichnen(fig, daten), die ein Bild in die (leere)
+            Figur fig zeichnet; muss auf Modulebene definiert sein, damit sie
+            an die Arbeitsprozesse uebergeben werden kann
+        ziel: Verzeichnis fuer eine PNG-Folge (bild_00000.png, ...) oder
+            Dateiname mit Endung .npz fuer einen komprimierten Bilderstapel
+            (je Bild ein Array "bild_00000", ... der Groesse Hoehe*Breite*3,
+            z.B. ``np.load(ziel)["bild_00000"]``)
+        prozesse: Anzahl der Arbeitsprozesse (Default: Anzahl der Kerne)
+        figsize: Bildgroesse in Zoll
+        dpi: Aufloesung
+    Rueckgabe:
+        anz: Anzahl der gespeicherten Bilder
+    """
+    if prozesse is None:
+        prozesse = os.cpu_count() or 1
+    stapel = ziel.endswith(".npz")
+    if not stapel:
+        os.makedirs(ziel, exist_ok=True)
+
+    ausstehend = []
+    anz = 0
+    with (zipfile.ZipFile(ziel, "w", compression=zipfile.ZIP_DEFLATED)
+          if stapel else contextlib.nullcontext()) as archiv, \
+            multiprocessing.Pool(prozesse) as pool:
+        for nummer, daten in enumerate(bilddaten):
+            pfad = None if stapel else os.path.join(
+                ziel, "bild_{:05d}.png".format(nummer))
+            ausstehend.append(pool.apply_async(
+                _bild_rendern, (zeichnen, daten, pfad, figsize, dpi)))
+            while len(ausstehend) > 2*prozesse:    # Rueckstau begrenzen
+                _bild_schreiben(archiv, anz, ausstehend.pop(0).get())
+                anz += 1
+        for auftrag in ausstehend:
+            _bild_schreiben(archiv, anz, auftrag.get())
+            anz += 1
+    return anz
+
+
+def _bild_schreiben(archiv, nummer, bild):
+    """Haenge ein gerendertes Bild an die .npz-Datei an (Zip-Archiv mit
+    einer .npy-Datei je Bild); PNG-Bilder sind schon gespeichert.
+    """
+    if archiv is None:
+        return
+    with archiv.open("bild_{:05d}.npy".format(nummer), "w",
+                     force_zip64=True) as datei:
+        np.lib.format.write_array(datei, bild)
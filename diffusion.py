@@ -0,0 +1,397 @@
+"""Gerichtete Diffusion mit absorbierendem Rand (siehe 9_1).
+
+Die Langevin-Gleichung dx = v_drift*dt + sqrt(2*D*dt)*xi wird fuer viele
+Realisierungen blockweise integriert. Jeder Block hat einen eigenen Zufalls-
+strom; pro Ausgabezeit werden nur suffiziente Statistiken behalten und ueber
+montecarlo.py reproduzierbar und parallel zusammengefuehrt.
+
+Ohne Rand ist die Loesung fuer konstante Drift und Diffusion gaussisch, so
+dass ein einziger exakter Schritt von einer Ausgabezeit zur naechsten ge-
+nuegt. Ob ein Teilchen dazwischen den absorbierenden Rand erreicht hat, wird
+mit der Treffwahrscheinlichkeit der Brownschen Bruecke
+    P = exp(-(x_abs - x_n)*(x_abs - x_{n+1})/(D*delta_t))
+ausgewuerfelt (unabhaengig von der Drift). Die Absorption ist damit exakt,
+ohne Diskretisierungsfehler am Rand.
+"""
+
+import functools
+import numpy as np
+from scipy.linalg import solve_banded
+import montecarlo
+
+
+def ausgabezeiten(T_max, delta_t, t_ausgabe=1.0):
+    """Bestimme die Ausgabezeiten t_n = 0, t_ausgabe, 2*t_ausgabe, ...
+
+    Rueckgabe:
+        t_n: Ausgabezeiten bis T_max
+        schritte: Anzahl der Zeitschritte delta_t zwischen zwei Ausgaben
+    """
+    schritte = max(1, int(round(t_ausgabe/delta_t)))
+    anz = int(np.floor(T_max/(schritte*delta_t) + 1e-9)) + 1
+    return np.arange(anz)*schritte*delta_t, schritte
+
+
+def bruecken_absorption(x_alt, x_neu, delta_t, D, x_abs, rng):
+    """Bestimme, welche Teilchen zwischen zwei Zeiten absorbiert wurden.
+
+    Parameter:
+        x_alt: Orte zu Beginn des Schritts (x_alt < x_abs)
+        x_neu: Orte am Ende des Schritts (frei propagiert)
+        delta_t: Laenge des Schritts
+        D: Diffusionskonstante
+        x_abs: Position des absorbierenden Randes
+        rng: np.random.Generator
+    Rueckgabe:
+        absorbiert: boolesches Array (True auch fuer x_neu >= x_abs)
+    """
+    treff = np.exp(-np.maximum(x_abs - x_alt, 0) *
+                   np.maximum(x_abs - x_neu, 0)/(D*delta_t))
+    return rng.random(len(x_neu)) < treff
+
+
+def exakter_schritt(x, delta_t, D, v_drift, rng):
+    """Exakter Schritt der freien Drift-Diffusion ueber delta_t."""
+    return x + v_drift*delta_t + np.sqrt(2*D*delta_t)*rng.standard_normal(
+        len(x))
+
+
+def driftdiffusion_exakt(x_0, zeiten, D, v_drift, x_abs, rng=None):
+    """Propagiere die Teilchen exakt von Ausgabezeit zu Ausgabezeit.
+
+    Die Orte aller Teilchen werden frei (ohne Rand) weiterpropagiert, damit
+    sich auch die Groessen ohne Absorption bestimmen lassen; die Maske
+    `lebendig` markiert die noch nicht absorbierten Teilchen.
+
+    Parameter:
+        x_0: Anfangsorte (Array)
+        zeiten: aufsteigende Ausgabezeiten (beliebige Abstaende)
+        D: Diffusionskonstante
+        v_drift: Driftgeschwindigkeit
+        x_abs: Position des absorbierenden Randes
+        rng: np.random.Generator (Default: neuer Generator)
+    Rueckgabe:
+        Generator von (t, x_t, lebendig) fuer alle Zeiten
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    x_t = np.array(x_0, dtype=float)
+    lebendig = x_t < x_abs
+    t_alt = zeiten[0]
+    for t in zeiten:
+        if t > t_alt:
+            x_neu = exakter_schritt(x_t, t - t_alt, D, v_drift, rng)
+            lebendig &= ~bruecken_absorption(x_t, x_neu, t - t_alt, D, x_abs,
+                                             rng)
+            x_t = x_neu
+            t_alt = t
+        yield t, x_t, lebendig
+
+
+def _werte(f, x):
+    """Wert eines konstanten oder ortsabhaengigen Koeffizienten an x."""
+    return f(x) if callable(f) else f
+
+
+def absorbierende_diffusion(x_0, zeiten, D, v_drift, x_abs, delta_t=None,
+                            rng=None, bruecke=True, kompaktieren=0.5):
+    """Propagiere nur die nicht absorbierten Teilchen (Walker).
+
+    Absorbierte Teilchen werden dauerhaft entfernt und koennen nicht wieder
+    unter x_abs zurueckwandern; ihre Absorptionszeit wird gespeichert. Die
+    Arrays der Ueberlebenden werden verdichtet, sobald weniger als der An-
+    teil `kompaktieren` der gespeicherten Teilchen noch lebt; der Aufwand
+    pro Schritt skaliert also mit der Zahl der Ueberlebenden.
+
+    Fuer konstante D und v_drift und delta_t=None wird exakt von Ausgabezeit
+    zu Ausgabezeit propagiert, sonst mit Euler-Schritten der Laenge delta_t
+    (D und v_drift am Anfang jedes Schritts ausgewertet).
+
+    Parameter:
+        x_0: Anfangsorte (Array der Laenge R)
+        zeiten: aufsteigende Ausgabezeiten
+        D: Diffusionskonstante oder Funktion D(x)
+        v_drift: Driftgeschwindigkeit oder Funktion v_drift(x)
+        x_abs: Position des absorbierenden Randes
+        delta_t: Zeitschrittweite (None: exakte Schritte, nur fuer
+            konstante Koeffizienten)
+        rng: np.random.Generator (Default: neuer Generator)
+        bruecke: Absorption auch ueber das Brueckenkriterium (sonst nur,
+            wenn ein Teilchen am Ende eines Schritts hinter x_abs liegt)
+        kompaktieren: Anteil lebender Teilchen, unter dem verdichtet wird
+    Rueckgabe:
+        Generator von (t, x_lebend, t_abs) fuer alle Ausgabezeiten, mit den
+        Orten der Ueberlebenden und den Absorptionszeiten aller R Teilchen
+        (Ende des Schritts, in dem sie absorbiert wurden; np.inf fuer
+        Ueberlebende; dasselbe Array wird fortlaufend aktualisiert)
+    """
+    if delta_t is None and (callable(D) or callable(v_drift)):
+        raise ValueError("ortsabhaengige Koeffizienten erfordern delta_t")
+    if rng is None:
+        rng = np.random.default_rng()
+    x = np.array(x_0, dtype=float)
+    nummer = np.arange(len(x))               # Index im Anfangsensemble
+    t_abs = np.full(len(x), np.inf)
+    lebendig = x < x_abs
+    t_abs[~lebendig] = zeiten[0]
+    anz_lebend = np.count_nonzero(lebendig)
+    t = zeiten[0]
+    for t_n in zeiten:
+        while t_n - t > 1e-9*(delta_t or 1.0):
+            dt = t_n - t if delta_t is None else min(delta_t, t_n - t)
+            D_x = _werte(D, x)
+            x_neu = (x + _werte(v_drift, x)*dt +
+                     np.sqrt(2*D_x*dt)*rng.standard_normal(len(x)))
+            if bruecke:
+                absorbiert = bruecken_absorption(x, x_neu, dt, D_x, x_abs,
+                                                 rng)
+            else:
+                absorbiert = x_neu >= x_abs
+            absorbiert &= lebendig
+            t_abs[nummer[absorbiert]] = t + dt
+            lebendig &= ~absorbiert
+            anz_lebend -= np.count_nonzero(absorbiert)
+            x = x_neu
+            t += dt
+            if anz_lebend < kompaktieren*len(x):     # Ueberlebende verdichten
+                x, nummer = x[lebendig], nummer[lebendig]
+                lebendig = np.ones(len(x), dtype=bool)
+        t = t_n
+        yield t_n, x[lebendig], t_abs
+
+
+def _langevin_abschnitt(x_0, D, v_drift, x_abs, delta_t, kanten, exakt,
+                        auftrag):
+    """Fuehre einen Block von Realisierungen ueber einen Abschnitt von
+    Ausgabezeiten weiter.
+
+    Der Auftrag ist (zustand, zeiten). Im ersten Abschnitt ist der Zustand
+    (anz, SeedSequence) und zeiten[0] die Startzeit, deren Statistik mit
+    ausgegeben wird; sonst ist er das dict, das der vorige Abschnitt zurueck-
+    gegeben hat, und zeiten[0] dessen letzte Zeit.
+
+    Rueckgabe: neuer Zustand und pro Ausgabezeit eine Liste [alle,
+    ueberlebende] von Statistiken der Orte aller Teilchen (ohne Absorption)
+    bzw. der nicht absorbierten Teilchen. Ohne exakt werden die Ueber-
+    lebenden mit Euler-Schritten delta_t propagiert (absorbiert, sobald
+    x >= x_abs) und die Groessen ohne Absorption aus einem frei (exakt)
+    propagierten Ensemble bestimmt.
+    """
+    zustand, zeiten = auftrag
+    ergebnis = []
+    if isinstance(zustand, tuple):           # erster Abschnitt
+        anz, seed_seq = zustand
+        x = np.full(anz, float(x_0))
+        zustand = {"x": x, "lebendig": x < x_abs, "x_lebend": x[x < x_abs],
+                   "rng": np.random.default_rng(seed_seq)}
+        ergebnis.append([montecarlo.statistik_block(x, kanten),
+                         montecarlo.statistik_block(zustand["x_lebend"],
+                                                    kanten)])
+    x, lebendig, rng = zustand["x"], zustand["lebendig"], zustand["rng"]
+    x_lebend = zustand["x_lebend"]
+    if not exakt:
+        # sofort verdichten, damit der Zufallsstrom nicht von der Lage der
+        # Abschnittsgrenzen abhaengt:
+        absorbierend = absorbierende_diffusion(x_lebend, zeiten, D, v_drift,
+                                               x_abs, delta_t, rng,
+                                               bruecke=False, kompaktieren=1.0)
+        next(absorbierend)                   # Startzeit, kein Schritt
+    for t_alt, t in zip(zeiten[:-1], zeiten[1:]):
+        x_neu = exakter_schritt(x, t - t_alt, D, v_drift, rng)
+        if exakt:
+            lebendig &= ~bruecken_absorption(x, x_neu, t - t_alt, D, x_abs,
+                                             rng)
+            x_lebend = x_neu[lebendig]
+        else:
+            x_lebend = next(absorbierend)[1]
+        x = x_neu
+        ergebnis.append([montecarlo.statistik_block(x, kanten),
+                         montecarlo.statistik_block(x_lebend, kanten)])
+    return ({"x": x, "lebendig": lebendig, "x_lebend": x_lebend, "rng": rng},
+            ergebnis)
+
+
+def _langevin_block(x_0, D, v_drift, x_abs, delta_t, schritte, anz_zeiten,
+                    kanten, exakt, auftrag):
+    """Integriere einen Block von Realisierungen mit eigenem Zufallsstrom
+    ueber alle Ausgabezeiten (siehe _langevin_abschnitt).
+    """
+    zeiten = np.arange(anz_zeiten)*schritte*delta_t
+    return _langevin_abschnitt(x_0, D, v_drift, x_abs, delta_t, kanten,
+                               exakt, (auftrag, zeiten))[1]
+
+
+def langevin_statistik(x_0, T_max, delta_t, R, D, v_drift, x_abs, kanten,
+                       t_ausgabe=1.0, blockgroesse=2**14, seed=None,
+                       prozesse=None, exakt=True):
+    """Statistik der gerichteten Diffusion zu den Ausgabezeiten.
+
+    Fuer einen festen Seed ist das Ergebnis unabhaengig von der Anzahl der
+    Prozesse.
+
+    Parameter:
+        x_0: Anfangsort (fuer alle Realisierungen gleich)
+        T_max: maximal betrachtete Zeit
+        delta_t: Zeitschrittweite (nur fuer exakt=False)
+        R: Anzahl der Realisierungen
+        D: Diffusionskonstante
+        v_drift: Driftgeschwindigkeit
+        x_abs: Position des absorbierenden Randes
+        kanten: feste Bin-Kanten des Histogramms
+        t_ausgabe: Abstand der Ausgabezeiten
+        blockgroesse: Anzahl der Realisierungen pro Block
+        seed: Startwert (int) oder None fuer einen zufaelligen Startwert
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+        exakt: ein exakter Schritt pro Ausgabezeit mit Brueckenkriterium
+            fuer die Absorption; sonst Euler-Schritte delta_t (siehe
+            _langevin_block)
+    Rueckgabe:
+        t_n: Ausgabezeiten
+        statistiken: pro Ausgabezeit [alle, ueberlebende] (siehe
+            montecarlo.statistik_block)
+        entropie: Startwert zum Wiederholen der Rechnung
+    """
+    t_n, schritte = ausgabezeiten(T_max, delta_t, t_ausgabe)
+    auftraege, entropie = montecarlo.bloecke_aufteilen(R, blockgroesse, seed)
+    statistiken = montecarlo.parallel_ausfuehren(
+        functools.partial(_langevin_block, x_0, D, v_drift, x_abs, delta_t,
+                          schritte, len(t_n), kanten, exakt), auftraege,
+        prozesse)
+    return t_n, statistiken, entropie
+
+
+def langevin_statistik_fortlaufend(x_0, T_max, delta_t, R, D, v_drift, x_abs,
+                                   kanten, t_ausgabe=1.0, blockgroesse=2**14,
+                                   seed=None, prozesse=None, exakt=True,
+                                   abschnitt=4):
+    """Wie `langevin_statistik`, liefert die Statistiken aber fortlaufend.
+
+    Die Bloecke werden abschnittsweise (je `abschnitt` Ausgabezeiten) weiter-
+    propagiert und nach jedem Abschnitt zusammengefuehrt, so dass z.B. Bilder
+    schon gezeichnet werden koennen, waehrend der naechste Abschnitt simu-
+    liert wird. Dafuer werden die Orte aller R Teilchen zwischen den Ab-
+    schnitten gehalten (Speicher O(R)); die Ergebnisse stimmen fuer einen
+    festen Seed mit denen von `langevin_statistik` ueberein.
+
+    Parameter: wie `langevin_statistik`, zusaetzlich
+        abschnitt: Anzahl der Ausgabezeiten pro Abschnitt
+    Rueckgabe:
+        t_n: Ausgabezeiten
+        statistiken: Generator von [alle, ueberlebende] je Ausgabezeit
+        entropie: Startwert zum Wiederholen der Rechnung
+    """
+    t_n, _schritte = ausgabezeiten(T_max, delta_t, t_ausgabe)
+    auftraege, entropie = montecarlo.bloecke_aufteilen(R, blockgroesse, seed)
+    # jeder Abschnitt beginnt mit der letzten Zeit des vorigen:
+    abschnitte = [t_n[max(start - 1, 0):start + abschnitt]
+                  for start in range(0, len(t_n), abschnitt)]
+    ergebnisse = montecarlo.abschnittsweise_ausfuehren(
+        functools.partial(_langevin_abschnitt, x_0, D, v_drift, x_abs,
+                          delta_t, kanten, exakt), auftraege, abschnitte,
+        prozesse)
+    statistiken = (statistik for teil in ergebnisse for statistik in teil)
+    return t_n, statistiken, entropie
+
+
+def fokker_planck_operator(x_min, x_abs, M, D, v_drift):
+    """Finite-Volumen-Diskretisierung der Fokker-Planck-Gleichung
+        dP/dt = -d/dx (v_drift(x)*P) + d^2/dx^2 (D(x)*P)
+    auf M Zellen zwischen x_min und x_abs.
+
+    Am linken Rand verschwindet der Fluss (reflektierend, x_min weit links
+    waehlen), am rechten Rand ist P(x_abs) = 0 (absorbierend). Der Fluss
+    J = v_drift*P - d(D*P)/dx wird an den Zellgrenzen zentral diskretisiert.
+
+    Parameter:
+        x_min: linker Rand
+        x_abs: Position des absorbierenden Randes
+        M: Anzahl der Zellen
+        D: Diffusionskonstante oder Funktion D(x)
+        v_drift: Driftgeschwindigkeit oder Funktion v_drift(x)
+    Rueckgabe:
+        x: Zellmittelpunkte
+        band: tridiagonale Matrix A (dP/dt = A P) im Bandformat von
+            scipy.linalg.solve_banded (3*M: obere, Haupt-, untere Diagonale)
+    """
+    h = (x_abs - x_min)/M
+    x = x_min + (np.arange(M) + 0.5)*h
+    D_x = np.broadcast_to(_werte(D, x), (M,))
+    v_grenze = np.broadcast_to(_werte(v_drift, x[:-1] + h/2), (M - 1,))
+
+    # Fluss durch die Grenze i+1/2: J = a_i*P_i + b_i*P_{i+1}
+    a = v_grenze/2 + D_x[:-1]/h
+    b = v_grenze/2 - D_x[1:]/h
+    band = np.zeros((3, M))
+    band[1, :-1] -= a/h                      # Abfluss nach rechts
+    band[0, 1:] -= b/h
+    band[1, 1:] += b/h                       # Zufluss von links
+    band[2, :-1] += a/h
+    band[1, -1] -= 2*D_x[-1]/h**2            # Fluss in den Rand (P = 0)
+    return x, band
+
+
+def _implizit_loesen(band, P, faktor, explizit):
+    """Loese (1 - faktor*A) P_neu = P + explizit*A P (A im Bandformat)."""
+    links = -faktor*band
+    links[1] += 1.0
+    rechts = P.copy()
+    if explizit:
+        rechts += explizit*(band[1]*P)
+        rechts[:-1] += explizit*band[0, 1:]*P[1:]
+        rechts[1:] += explizit*band[2, :-1]*P[:-1]
+    return solve_banded((1, 1), links, rechts)
+
+
+def fokker_planck(x_min, x_abs, M, zeiten, D, v_drift, x_0=0.0, P_0=None,
+                  dt=0.05, anlauf=4):
+    """Loese die Fokker-Planck-Gleichung mit absorbierendem Rand
+    deterministisch (Crank-Nicolson, eine Bandloesung pro Zeitschritt).
+
+    Fuer eine Delta-Anfangsverteilung wird der erste Schritt durch `anlauf`
+    implizite Euler-Schritte der Laenge dt/anlauf ersetzt, die die sonst bei
+    Crank-Nicolson auftretenden Oszillationen daempfen.
+
+    Parameter:
+        x_min: linker (reflektierender) Rand
+        x_abs: Position des absorbierenden Randes
+        M: Anzahl der Zellen
+        zeiten: aufsteigende Ausgabezeiten (die erste ist die Startzeit)
+        D: Diffusionskonstante oder Funktion D(x)
+        v_drift: Driftgeschwindigkeit oder Funktion v_drift(x)
+        x_0: Anfangsort (Delta-Verteilung), falls P_0 None ist
+        P_0: Anfangsdichte in den Zellmittelpunkten
+        dt: maximale Zeitschrittweite
+        anlauf: Anzahl der impliziten Anlaufschritte (0: keine)
+    Rueckgabe:
+        ergebnis: dict mit "x" (Zellmittelpunkte), "P" (Dichte, Zeiten*M),
+            "norm", "mittel" und "varianz" (der Ueberlebenden) je Zeit
+    """
+    x, band = fokker_planck_operator(x_min, x_abs, M, D, v_drift)
+    h = x[1] - x[0]
+    if P_0 is None:                          # Delta an x_0 auf die beiden
+        P = np.zeros(M)                      # naechsten Zellen verteilen
+        s = np.clip((x_0 - x[0])/h, 0, M - 1)
+        i = min(int(s), M - 2)
+        P[i:i + 2] = np.array([1 - (s - i), s - i])/h
+    else:
+        P = np.array(P_0, dtype=float)
+
+    P_t = []
+    t = zeiten[0]
+    for t_n in zeiten:
+        while t_n - t > 1e-9*dt:
+            schritt = min(dt, t_n - t)
+            if anlauf and t == zeiten[0]:
+                for _i in range(anlauf):
+                    P = _implizit_loesen(band, P, schritt/anlauf, 0.0)
+            else:
+                P = _implizit_loesen(band, P, schritt/2, schritt/2)
+            t += schritt
+        t = t_n
+        P_t.append(P)
+
+    P_t = np.array(P_t)
+    norm = h*np.sum(P_t, axis=1)
+    mittel = h*np.dot(P_t, x)/norm
+    return {"x": x, "P": P_t, "norm": norm, "mittel": mittel,
+            "varianz": h*np.dot(P_t, x**2)/norm - mittel**2}
@@ -0,0 +1,136 @@
+"""Erstpassagezeiten der gerichteten Diffusion zum absorbierenden Rand.
+
+Die Norm R(t)/R in 9_1 ist die Ueberlebensfunktion S(t) = P(T > t) der
+Erstpassagezeit T von x_0 nach x_abs. Fuer konstante Drift v und Diffusion D
+ist T (mit L = x_abs - x_0) invers-gaussverteilt mit Mittelwert L/v und
+Formparameter L**2/(2*D); fuer v <= 0 wird der Rand nur mit der Wahrschein-
+lichkeit exp(v*L/D) ueberhaupt erreicht. Die Zeiten lassen sich dann direkt
+ziehen (ein Zufallswert pro Teilchen) und S(t) und die Dichte sind analytisch
+bekannt. Fuer ortsabhaengige Koeffizienten werden stattdessen die Absorp-
+tionszeiten der Teilchen-Simulation (diffusion.absorbierende_diffusion)
+verwendet.
+"""
+
+import numpy as np
+from scipy.special import log_ndtr, ndtr
+import diffusion
+
+
+def dichte(t, x_0, x_abs, D, v_drift):
+    """Analytische Dichte der Erstpassagezeit (konstante Koeffizienten).
+
+    f(t) = L/sqrt(4*pi*D*t**3) * exp(-(L - v_drift*t)**2/(4*D*t))
+
+    Parameter:
+        t: Zeiten (> 0)
+        x_0: Anfangsort (< x_abs)
+        x_abs: Position des absorbierenden Randes
+        D: Diffusionskonstante
+        v_drift: Driftgeschwindigkeit
+    Rueckgabe:
+        f: Dichte an den Zeiten t (fuer v_drift < 0 mit Integral < 1)
+    """
+    t = np.asarray(t, dtype=float)
+    L = x_abs - x_0
+    return L/np.sqrt(4*np.pi*D*t**3) * np.exp(-(L - v_drift*t)**2/(4*D*t))
+
+
+def ueberleben(t, x_0, x_abs, D, v_drift):
+    """Analytische Ueberlebensfunktion S(t) (konstante Koeffizienten).
+
+    S(t) = Phi((L - v*t)/s) - exp(v*L/D)*Phi((-L - v*t)/s), s = sqrt(2*D*t);
+    der zweite Term wird logarithmisch berechnet, damit exp(v*L/D) auch fuer
+    grosse Peclet-Zahlen nicht ueberlaeuft.
+
+    Parameter: wie `dichte` (t >= 0)
+    Rueckgabe:
+        S: Wahrscheinlichkeit, bis t noch nicht absorbiert zu sein
+    """
+    t = np.asarray(t, dtype=float)
+    L = x_abs - x_0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.sqrt(2*D*t)
+        S = (ndtr((L - v_drift*t)/s) -
+             np.exp(v_drift*L/D + log_ndtr((-L - v_drift*t)/s)))
+    return np.where(t > 0, S, 1.0)
+
+
+def ziehen(R, x_0, x_abs, D, v_drift, rng=None):
+    """Ziehe die Erstpassagezeiten von R Teilchen direkt.
+
+    Parameter:
+        R: Anzahl der Teilchen
+        x_0, x_abs, D, v_drift: wie `dichte` (konstante Koeffizienten)
+        rng: np.random.Generator (Default: neuer Generator)
+    Rueckgabe:
+        t_abs: Absorptionszeiten (np.inf fuer nie absorbierte Teilchen)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    L = x_abs - x_0
+    if L <= 0:
+        return np.zeros(R)
+    if v_drift == 0:                         # Levy-Verteilung
+        return L**2/(2*D*rng.standard_normal(R)**2)
+    # fuer v < 0 ist T bedingt auf Absorption wie fuer -v verteilt:
+    t_abs = rng.wald(L/abs(v_drift), L**2/(2*D), size=R)
+    if v_drift < 0:
+        t_abs[rng.random(R) >= np.exp(v_drift*L/D)] = np.inf
+    return t_abs
+
+
+def ueberleben_aus_zeiten(zeiten, t_abs, R=None):
+    """Empirische Ueberlebensfunktion aus Absorptionszeiten.
+
+    Parameter:
+        zeiten: aufsteigende Zeiten
+        t_abs: Absorptionszeiten (np.inf fuer Ueberlebende)
+        R: Gesamtzahl der Teilchen (Default: len(t_abs))
+    Rueckgabe:
+        S: Anteil der bis zu den Zeiten nicht absorbierten Teilchen
+    """
+    R = len(t_abs) if R is None else R
+    absorbiert = np.bincount(np.searchsorted(zeiten, t_abs, side="left"),
+                             minlength=len(zeiten) + 1)
+    return 1 - np.cumsum(absorbiert)[:len(zeiten)]/R
+
+
+def ueberleben_stichprobe(zeiten, R, x_0, x_abs, D, v_drift, delta_t=0.01,
+                          rng=None, blockgroesse=2**22):
+    """Schaetze S(t) aus R Teilchen mit begrenztem Speicher.
+
+    Fuer konstante D und v_drift werden die Erstpassagezeiten blockweise
+    direkt gezogen (Aufwand ein Zufallswert pro Teilchen, unabhaengig von
+    den Zeiten). Sind D oder v_drift Funktionen von x, werden die Teilchen
+    mit diffusion.absorbierende_diffusion (Schrittweite delta_t) propagiert
+    und deren Absorptionszeiten verwendet.
+
+    Parameter:
+        zeiten: aufsteigende Zeiten
+        R: Anzahl der Teilchen
+        x_0: Anfangsort
+        x_abs: Position des absorbierenden Randes
+        D: Diffusionskonstante oder Funktion D(x)
+        v_drift: Driftgeschwindigkeit oder Funktion v_drift(x)
+        delta_t: Zeitschrittweite der Simulation (nur ortsabhaengig)
+        rng: np.random.Generator (Default: neuer Generator)
+        blockgroesse: Anzahl der Teilchen pro Block
+    Rueckgabe:
+        S: Anteil der bis zu den Zeiten nicht absorbierten Teilchen
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    zeiten = np.asarray(zeiten, dtype=float)
+    absorbiert = np.zeros(len(zeiten))
+    for start in range(0, R, blockgroesse):
+        anz = min(blockgroesse, R - start)
+        if callable(D) or callable(v_drift):
+            simulation = diffusion.absorbierende_diffusion(
+                np.full(anz, float(x_0)), np.append(0.0, zeiten), D,
+                v_drift, x_abs, delta_t, rng)
+            for _t, _x, t_abs in simulation:
+                pass
+        else:
+            t_abs = ziehen(anz, x_0, x_abs, D, v_drift, rng)
+        absorbiert += (1 - ueberleben_aus_zeiten(zeiten, t_abs))*anz
+    return 1 - absorbiert/R
@@ -0,0 +1,200 @@
+"""Ereignisgesteuerte Molekulardynamik eines Gases aus harten Kugeln.
+
+Zwischen zwei Stoessen bewegen sich die Teilchen geradlinig, die Dynamik ist
+daher durch die Folge der Ereignisse (Stoss mit einer Wand, Stoss zweier
+Teilchen, Wechsel in eine andere Zelle) exakt bestimmt. Die vorhergesagten
+Ereignisse liegen in einer Prioritaetswarteschlange (heapq). Jedes Teilchen
+hat einen Zaehler, der bei jedem seiner Ereignisse erhoeht wird; ein Ereig-
+nis merkt sich die Zaehler bei seiner Vorhersage und wird beim Entnehmen
+verworfen, wenn sie nicht mehr stimmen (verzoegerte Invalidierung). Mit
+Zellenlisten (Zellen mindestens so gross wie der Kugeldurchmesser) werden
+Paarstoesse nur mit Teilchen aus Nachbarzellen vorhergesagt, der Aufwand pro
+Ereignis ist also unabhaengig von N.
+
+Der Druck auf die rechte Wand (x = L) wird wie in 8_1 (siehe druck) aus dem
+uebertragenen Impuls pro Zeit und Teilchen bestimmt (Masse 1).
+"""
+
+import heapq
+import itertools
+import numpy as np
+
+WAND, PAAR, ZELLE = 0, 1, 2                  # Arten von Ereignissen
+
+
+def startzustand(N, L, radius, d=2, rng=None):
+    """Setze N Kugeln ohne Ueberlappung auf ein Gitter in der Box [0, L]^d
+    und ziehe standardnormalverteilte Geschwindigkeiten.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        L: Kantenlaenge der Box
+        radius: Kugelradius
+        d: Dimension
+        rng: np.random.Generator (Default: np.random.default_rng())
+    Rueckgabe:
+        r: Orte (N*d)
+        v: Geschwindigkeiten (N*d)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    n_seite = int(np.ceil(N**(1/d) - 1e-9))
+    abstand = L/n_seite
+    if abstand <= 2*radius:
+        raise ValueError("Kugeln passen nicht ohne Ueberlappung in die Box")
+    achse = (np.arange(n_seite) + 0.5)*abstand
+    gitter = np.stack(np.meshgrid(*[achse]*d, indexing="ij"),
+                      axis=-1).reshape(-1, d)
+    r = gitter[rng.permutation(len(gitter))[:N]]
+    return r, rng.standard_normal((N, d))
+
+
+def _zellindex(r, breite, m):
+    """Zellkoordinaten (ganzzahlig, pro Dimension) der Orte r."""
+    return np.clip((r/breite).astype(int), 0, m - 1)
+
+
+def _nachbarzellen(m, d):
+    """Liste der (flachen) Indizes der Nachbarzellen jeder Zelle (inklusive
+    der Zelle selbst) fuer ein Gitter aus m**d Zellen ohne Periodizitaet.
+    """
+    nachbarn = []
+    for zelle in itertools.product(range(m), repeat=d):
+        nachbarn.append([int(np.ravel_multi_index(nachbar, (m,)*d))
+                         for nachbar in itertools.product(
+                             *[range(max(c - 1, 0), min(c + 2, m))
+                               for c in zelle])])
+    return nachbarn
+
+
+def stossdynamik(r, v, L, radius, T, m=None):
+    """Integriere die Dynamik harter Kugeln in der Box [0, L]^d bis T.
+
+    Parameter:
+        r: Anfangsorte (N*d, Abstaende >= 2*radius, Abstand zur Wand
+            >= radius)
+        v: Anfangsgeschwindigkeiten (N*d)
+        L: Kantenlaenge der Box
+        radius: Kugelradius (0 fuer ein ideales Gas)
+        T: Endzeit
+        m: Anzahl der Zellen pro Dimension (Default: groesste Anzahl mit
+            Zellbreite >= 2*radius, hoechstens N**(1/d) + 1)
+    Rueckgabe:
+        ergebnis: dict mit
+            "r", "v": Orte und Geschwindigkeiten zur Zeit T
+            "impuls": uebertragener Impuls je Wand (d*2: Dimension, links/
+                rechts)
+            "druck": Impuls auf die rechte Wand pro Zeit und Teilchen
+            "wandstoesse", "paarstoesse", "ereignisse": Anzahlen
+    """
+    r = np.array(r, dtype=float)
+    v = np.array(v, dtype=float)
+    N, d = r.shape
+    durchmesser2 = (2*radius)**2
+    if m is None:
+        m = int(L/(2*radius)) if radius > 0 else 1
+        m = max(1, min(m, int(N**(1/d)) + 1))
+    breite = L/m
+    nachbarzellen = _nachbarzellen(m, d)
+    schritt = m**np.arange(d - 1, -1, -1)    # Zellkoordinaten -> flach
+
+    t_teilchen = np.zeros(N)                 # Zeit, zu der r[i] gilt
+    zaehler = [0]*N                          # Ereigniszaehler
+    zelle = _zellindex(r, breite, m)
+    flach = list(zelle @ schritt)            # flacher Zellindex je Teilchen
+    zellen = [set() for _i in range(m**d)]
+    for i in range(N):
+        zellen[flach[i]].add(i)
+    impuls = np.zeros((d, 2))
+    anz = {WAND: 0, PAAR: 0, ZELLE: 0}
+    warteschlange = []
+    nummer = itertools.count()               # bei gleichen Zeiten: FIFO
+
+    def ort(i, t):
+        return r[i] + v[i]*(t - t_teilchen[i])
+
+    def vorhersagen(i, t):
+        """Sage Wand-, Zell- und Paarereignisse von Teilchen i ab t vorher."""
+        r_i = ort(i, t)
+        # Wand und Zellgrenze je Achse (mit Python-Zahlen, da skalar):
+        for k, (x, v_k, c) in enumerate(zip(r_i.tolist(), v[i].tolist(),
+                                            zelle[i].tolist())):
+            if v_k > 0:
+                t_wand = (L - radius - x)/v_k
+                t_zelle = ((c + 1)*breite - x)/v_k
+                naechste = c + 1 < m
+            elif v_k < 0:
+                t_wand = (radius - x)/v_k
+                t_zelle = (c*breite - x)/v_k
+                naechste = c > 0
+            else:
+                continue
+            heapq.heappush(warteschlange, (t + max(t_wand, 0.0), next(nummer),
+                                           WAND, i, k, zaehler[i], 0))
+            if naechste:
+                heapq.heappush(warteschlange, (t + max(t_zelle, 0.0),
+                                               next(nummer), ZELLE, i, k,
+                                               zaehler[i], 0))
+        if radius == 0:
+            return
+        j = np.array([j for c in nachbarzellen[flach[i]] for j in zellen[c]
+                      if j != i], dtype=int)
+        if len(j) == 0:
+            return
+        dr = r[j] + v[j]*(t - t_teilchen[j])[:, None] - r_i
+        dv = v[j] - v[i]
+        b = np.sum(dr*dv, axis=1)
+        dv2 = np.sum(dv*dv, axis=1)
+        diskriminante = b**2 - dv2*(np.sum(dr*dr, axis=1) - durchmesser2)
+        treffer = (b < 0) & (diskriminante > 0)
+        dt = (-b[treffer] - np.sqrt(diskriminante[treffer]))/dv2[treffer]
+        for j_k, dt_k in zip(j[treffer].tolist(), dt.tolist()):
+            heapq.heappush(warteschlange, (t + max(dt_k, 0.0), next(nummer),
+                                           PAAR, i, j_k, zaehler[i],
+                                           zaehler[j_k]))
+
+    def bewegen(i, t):
+        r[i] = ort(i, t)
+        t_teilchen[i] = t
+
+    for i in range(N):
+        vorhersagen(i, 0.0)
+
+    while warteschlange and warteschlange[0][0] <= T:
+        t, _nr, art, i, j, zaehler_i, zaehler_j = heapq.heappop(warteschlange)
+        if zaehler[i] != zaehler_i or (art == PAAR and
+                                       zaehler[j] != zaehler_j):
+            continue                         # veraltetes Ereignis
+        anz[art] += 1
+        if art == WAND:                      # j ist hier die Achse
+            bewegen(i, t)
+            impuls[j, int(v[i, j] > 0)] += 2*abs(v[i, j])
+            v[i, j] = -v[i, j]
+            zaehler[i] += 1
+            vorhersagen(i, t)
+        elif art == PAAR:
+            bewegen(i, t)
+            bewegen(j, t)
+            dr = r[j] - r[i]
+            dv = (np.dot(dr, v[j] - v[i])/np.dot(dr, dr))*dr
+            v[i] += dv
+            v[j] -= dv
+            zaehler[i] += 1
+            zaehler[j] += 1
+            vorhersagen(i, t)
+            vorhersagen(j, t)
+        else:                                # Zellwechsel entlang Achse j
+            bewegen(i, t)
+            zellen[flach[i]].discard(i)
+            richtung = 1 if v[i, j] > 0 else -1
+            zelle[i, j] += richtung
+            flach[i] += richtung*schritt[j]
+            zellen[flach[i]].add(i)
+            zaehler[i] += 1                  # alte Vorhersagen verwerfen
+            vorhersagen(i, t)
+
+    for i in range(N):
+        bewegen(i, T)
+    return {"r": r, "v": v, "impuls": impuls, "druck": impuls[0, 1]/(N*T),
+            "wandstoesse": anz[WAND], "paarstoesse": anz[PAAR],
+            "ereignisse": sum(anz.values())}
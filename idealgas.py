@@ -0,0 +1,328 @@
+"""Monte-Carlo-Berechnung des Drucks eines idealen Gases (siehe 8_1).
+
+Die Realisierungen werden blockweise als (Block, N)-Arrays erzeugt und aus-
+gewertet. Von den Druckwerten werden nur suffiziente Statistiken (Anzahl,
+Mittelwert, Summe der Abweichungsquadrate, Minimum, Maximum und ein Histo-
+gramm mit festen Bins) behalten, die sich exakt zusammenfuehren lassen (siehe
+montecarlo.py). Der Speicherbedarf ist damit unabhaengig von der Zahl R der
+Realisierungen.
+"""
+
+import functools
+import numpy as np
+from scipy.special import chdtri, ndtri
+import montecarlo
+
+
+def reflexionen(x_0, v, delta_t):
+    """Berechne die Anzahl der Reflexionen an der rechten Wand.
+
+    Herleitung der Formel siehe *) in der Diskussion von 8_1.
+
+    Parameter:
+        x_0: Anfangsorte der Teilchen (beliebige Form, z.B. Block*N)
+        v: Geschwindigkeiten der Teilchen (gleiche Form wie x_0)
+        delta_t: betrachtetes Zeitintervall
+    Rueckgabe:
+        n: Anzahl der Stoesse mit der rechten Wand (gleiche Form wie x_0)
+    """
+    x_end = x_0 + v*delta_t
+    return np.floor((np.abs(x_end) + 1)/2)
+
+
+def druck(N, delta_t, v, n):
+    """Berechne den Druck, den N Teilchen auf die rechte Wand ausueben, fuer
+    jede Realisierung eines Blocks.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        delta_t: betrachtetes Zeitintervall
+        v: Geschwindigkeiten, v[r, i] fuer Realisierung r und Teilchen i
+        n: Stoesse mit der rechten Wand (gleiche Form wie v)
+    Rueckgabe:
+        p: Druck je Realisierung (Array der Laenge v.shape[0])
+    """
+    return 2/(N*delta_t) * np.sum(np.abs(v)*n, axis=-1)
+
+
+def druck_block(N, delta_t, anz, rng):
+    """Erzeuge `anz` Realisierungen auf einmal und berechne ihre Druecke.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        delta_t: Zeitintervall
+        anz: Anzahl der Realisierungen im Block
+        rng: np.random.Generator
+    Rueckgabe:
+        p: Druecke (Array der Laenge anz)
+    """
+    x_0 = rng.uniform(0, 1, size=(anz, N))   # Orte gleichverteilt in [0, 1)
+    v = rng.standard_normal((anz, N))        # Geschwindigkeiten
+    return druck(N, delta_t, v, reflexionen(x_0, v, delta_t))
+
+
+def _druck_statistik(N, delta_t, kanten, auftrag):
+    """Statistik der Druecke eines Blocks mit eigenem Zufallsstrom."""
+    anz, seed_seq = auftrag
+    p = druck_block(N, delta_t, anz, np.random.default_rng(seed_seq))
+    return montecarlo.statistik_block(p, kanten)
+
+
+def druck_obergrenze(N, delta_t, wahrscheinlichkeit=1e-12):
+    """Obergrenze des Drucks, die nur mit der angegebenen Wahrscheinlichkeit
+    ueberschritten wird (fuer feste Histogramm-Kanten).
+
+    Wegen |x_end| <= 1 + |v|*delta_t ist n <= 1 + |v|*delta_t/2, also mit
+    S = sum(v**2) und sum(|v|) <= sqrt(N*S)
+        p <= (S + 2*sqrt(N*S)/delta_t) / N.
+    S ist chi^2-verteilt mit N Freiheitsgraden.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        delta_t: Zeitintervall
+        wahrscheinlichkeit: erlaubte Ueberschreitungswahrscheinlichkeit
+    Rueckgabe:
+        p_max: Obergrenze des Drucks
+    """
+    S = chdtri(N, wahrscheinlichkeit)        # (1 - w)-Quantil von chi^2_N
+    return (S + 2*np.sqrt(N*S)/delta_t) / N
+
+
+def druck_monte_carlo(N, R, delta_t, kanten=None, bins=30, ueberlauf=1e-4,
+                      blockgroesse=2**16, seed=None, prozesse=None):
+    """Monte-Carlo-Schaetzung der Druckverteilung mit begrenztem Speicher.
+
+    Die Bloecke werden parallel berechnet; fuer einen festen Seed ist das
+    Ergebnis unabhaengig von der Anzahl der Prozesse.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        R: Anzahl der Realisierungen
+        delta_t: Zeitintervall
+        kanten: feste Bin-Kanten des Histogramms; falls None, werden
+            `bins` Bins auf [0, druck_obergrenze(N, delta_t, ueberlauf)]
+            gelegt (Werte darueber zaehlt die Statistik unter "ueber")
+        bins: Anzahl der Bins (nur falls kanten None ist)
+        ueberlauf: hoechstens erlaubter Anteil der Werte oberhalb der
+            Bins (nur falls kanten None ist)
+        blockgroesse: Anzahl der Realisierungen pro Block
+        seed: Startwert (int) oder None fuer einen zufaelligen Startwert
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+    Rueckgabe:
+        statistik: suffiziente Statistiken der R Druckwerte, zusaetzlich
+            mit dem Eintrag "seed" zum Wiederholen der Rechnung
+    """
+    auftraege, entropie = montecarlo.bloecke_aufteilen(R, blockgroesse, seed)
+    if kanten is None:                       # nur aus den Parametern
+        kanten = np.linspace(0, druck_obergrenze(N, delta_t, ueberlauf),
+                             bins + 1)
+    statistik = montecarlo.parallel_ausfuehren(
+        functools.partial(_druck_statistik, N, delta_t, kanten), auftraege,
+        prozesse)
+    statistik["seed"] = entropie
+    return statistik
+
+
+BETRAG_V_MITTEL = np.sqrt(2/np.pi)    # <|v|> fuer standardnormalverteiltes v
+METHODEN = ("einfach", "antithetisch", "geschichtet", "kontrollvariable")
+
+
+def _antithetischer_block(N, delta_t, anz, rng):
+    """Druecke fuer anz/2 antithetische Paare von Realisierungen.
+
+    Die Geschwindigkeitsbetraege des Partners sind |v'| = F^-1(1 - u) zu
+    |v| = F^-1(u) (F: Verteilungsfunktion von |v|), Vorzeichen gleich; die
+    Anfangsorte werden gespiegelt (x_0' = 1 - x_0). Da der Druck im Wesent-
+    lichen mit |v| waechst, sind p und p' negativ korreliert.
+    """
+    m = anz//2
+    u = rng.random((m, N))
+    vorzeichen = np.where(rng.random((m, N)) < 0.5, -1.0, 1.0)
+    x_0 = rng.uniform(0, 1, size=(m, N))
+    x_0 = np.concatenate((x_0, 1 - x_0))
+    v = vorzeichen*ndtri(0.5 + 0.5*u)        # |v| = F^-1(u)
+    v = np.concatenate((v, vorzeichen*ndtri(1 - 0.5*u)))
+    return druck(N, delta_t, v, reflexionen(x_0, v, delta_t))
+
+
+def _geschichteter_block(N, delta_t, anz, rng):
+    """Druecke mit geschichteten Anfangsorten: fuer jedes Teilchen liegt in
+    jedem der anz Teilintervalle [j/anz, (j+1)/anz) genau ein Anfangsort
+    (Latin Hypercube ueber die Realisierungen eines Blocks).
+    """
+    schichten = rng.permuted(np.tile(np.arange(anz)[:, None], (1, N)), axis=0)
+    x_0 = (schichten + rng.random((anz, N)))/anz
+    v = rng.standard_normal((anz, N))
+    return druck(N, delta_t, v, reflexionen(x_0, v, delta_t))
+
+
+def _kontroll_block(N, delta_t, anz, rng):
+    """Druecke und Kontrollvariable c = mittleres |v| je Realisierung."""
+    x_0 = rng.uniform(0, 1, size=(anz, N))
+    v = rng.standard_normal((anz, N))
+    return (druck(N, delta_t, v, reflexionen(x_0, v, delta_t)),
+            np.mean(np.abs(v), axis=1))
+
+
+def _mittelwert_statistik(N, delta_t, methode, beta, auftrag):
+    """Statistik der rohen Druecke und des Schaetzers eines Blocks."""
+    anz, seed_seq = auftrag
+    rng = np.random.default_rng(seed_seq)
+    if methode == "antithetisch":
+        p = _antithetischer_block(N, delta_t, anz, rng)
+        schaetzer = p
+    elif methode == "geschichtet":
+        p = _geschichteter_block(N, delta_t, anz, rng)
+        schaetzer = p
+    elif methode == "kontrollvariable":
+        p, c = _kontroll_block(N, delta_t, anz, rng)
+        schaetzer = p - beta*(c - BETRAG_V_MITTEL)
+    else:
+        p = druck_block(N, delta_t, anz, rng)
+        schaetzer = p
+    return [montecarlo.statistik_block(p, None),
+            montecarlo.statistik_block(np.array([np.mean(schaetzer)]), None)]
+
+
+def druck_mittelwert(N, R, delta_t, methode="einfach", blockgroesse=2**12,
+                     seed=None, prozesse=None):
+    """Schaetze den mittleren Druck <p> mit Varianzreduktion.
+
+    Methoden:
+        "einfach": unabhaengige Realisierungen (Referenz)
+        "antithetisch": antithetische Paare (siehe _antithetischer_block)
+        "geschichtet": geschichtete Anfangsorte je Block
+        "kontrollvariable": p - beta*(c - <|v|>) mit c = mittleres |v| der
+            Realisierung und bekanntem <|v|> = sqrt(2/pi); beta = Cov(p, c)/
+            Var(c) wird aus einem unabhaengigen Vorlauf-Block bestimmt
+
+    Der statistische Fehler wird aus der Streuung der Blockmittelwerte be-
+    stimmt (gilt so auch fuer die innerhalb eines Blocks korrelierten
+    Methoden). Der Varianzreduktionsfaktor ist Var(p)/(blockgroesse*Var(
+    Blockmittel)), also der Faktor, um den die einfache Methode mehr Reali-
+    sierungen fuer den gleichen Fehler braucht.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        R: Anzahl der Realisierungen (wird auf ein Vielfaches von
+            blockgroesse aufgerundet, damit alle Bloecke gleich gross sind)
+        delta_t: Zeitintervall
+        methode: eine der Methoden aus METHODEN
+        blockgroesse: Realisierungen pro Block (gerade; mindestens zwei
+            Bloecke fuer die Fehlerabschaetzung)
+        seed: Startwert (int) oder None fuer einen zufaelligen Startwert
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+    Rueckgabe:
+        ergebnis: dict mit "mittel" (Schaetzwert fuer <p>), "fehler"
+            (Standardfehler), "faktor" (Varianzreduktionsfaktor), "R"
+            (tatsaechliche Anzahl der Realisierungen), "seed"
+    """
+    if methode not in METHODEN:
+        raise ValueError("unbekannte Methode: {}".format(methode))
+    if blockgroesse % 2:
+        raise ValueError("blockgroesse muss gerade sein")
+    anz_bloecke = max(2, -(-R//blockgroesse))
+    auftraege, entropie = montecarlo.bloecke_aufteilen(
+        anz_bloecke*blockgroesse, blockgroesse, seed)
+
+    beta = 0.0
+    if methode == "kontrollvariable":        # Vorlauf mit eigenem Strom
+        rng = np.random.default_rng(auftraege[0][1].spawn(1)[0])
+        p, c = _kontroll_block(N, delta_t, blockgroesse, rng)
+        beta = np.cov(p, c)[0, 1]/np.var(c, ddof=1)
+
+    roh, bloecke = montecarlo.parallel_ausfuehren(
+        functools.partial(_mittelwert_statistik, N, delta_t, methode, beta),
+        auftraege, prozesse)
+    _mittel, sigma_roh, _dichte = montecarlo.statistik_auswerten(roh)
+    mittel, sigma_block, _dichte = montecarlo.statistik_auswerten(bloecke)
+    return {"mittel": mittel, "fehler": sigma_block/np.sqrt(anz_bloecke),
+            "faktor": sigma_roh**2/(blockgroesse*sigma_block**2),
+            "R": anz_bloecke*blockgroesse, "seed": entropie}
+
+
+def einteilchen_tabelle(delta_t, v_max=8.0, anz_v=200000, anz_w=8192):
+    """Tabelliere die Verteilung des Beitrags w = 2*|v|*n/delta_t eines
+    Teilchens zum Druck (p = Mittelwert der w_i ueber die N Teilchen).
+
+    Fuer jede Geschwindigkeit v (Mittelpunktsregel auf [-v_max, v_max]) ist
+    x_end = x_0 + v*delta_t gleichverteilt auf [v*delta_t, v*delta_t + 1].
+    Die Stosszahl n aendert sich nur an ungeraden ganzen Zahlen |x_end|, das
+    Intervall wird also in hoechstens zwei Teile mit konstantem n zerlegt
+    und die Wahrscheinlichkeiten sind exakt. Die Massen werden linear auf
+    ein aequidistantes w-Gitter verteilt.
+
+    Parameter:
+        delta_t: Zeitintervall
+        v_max: groesste betrachtete Geschwindigkeit (in Einheiten von sigma)
+        anz_v: Anzahl der Geschwindigkeiten
+        anz_w: Anzahl der Gitterpunkte fuer w
+    Rueckgabe:
+        tabelle: dict mit "w" (Gitter), "masse" (Wahrscheinlichkeit je
+            Gitterpunkt, Summe 1), "mittel" und "sigma" von w
+    """
+    dv = 2*v_max/anz_v
+    v = -v_max + (np.arange(anz_v) + 0.5)*dv
+    gewicht = np.exp(-v**2/2)
+    gewicht /= np.sum(gewicht)               # Normalverteilung auf dem Gitter
+
+    a = v*delta_t                            # x_end in [a, a + 1]
+    grenze = 2*np.floor((a + 1)/2) + 1       # naechste ungerade Zahl > a
+    anteil_1 = np.clip(grenze - a, 0, 1)     # Teil links der Grenze
+    mitte_1 = a + anteil_1/2
+    mitte_2 = np.minimum(grenze, a + 1) + (1 - anteil_1)/2
+    w = np.concatenate((2*np.abs(v)*reflexionen(0, mitte_1, 1)/delta_t,
+                        2*np.abs(v)*reflexionen(0, mitte_2, 1)/delta_t))
+    masse = np.concatenate((gewicht*anteil_1, gewicht*(1 - anteil_1)))
+
+    w_gitter = np.linspace(0, np.max(w), anz_w)
+    h = w_gitter[1] - w_gitter[0]
+    index = np.minimum((w/h).astype(int), anz_w - 2)
+    rechts = w/h - index                     # lineare Verteilung der Masse
+    tabelle = (np.bincount(index, masse*(1 - rechts), anz_w) +
+               np.bincount(index + 1, masse*rechts, anz_w))
+    mittel = np.sum(tabelle*w_gitter)
+    return {"w": w_gitter, "masse": tabelle, "mittel": mittel,
+            "sigma": np.sqrt(np.sum(tabelle*(w_gitter - mittel)**2))}
+
+
+def druck_verteilung(N, delta_t, tabelle=None, anz=2048, breite=12.0):
+    """Berechne die Wahrscheinlichkeitsdichte des Drucks fuer N Teilchen.
+
+    Der Druck ist der Mittelwert von N unabhaengigen Beitraegen w_i, seine
+    charakteristische Funktion also phi_p(t) = phi_w(t/N)**N. Sie wird auf
+    einem Frequenzgitter aus der tabellierten Einteilchen-Verteilung berech-
+    net (zentriert um <w> und ueber log(1 + z), damit auch N = 6*10**23 genau
+    bleibt) und per FFT auf ein Gitter um <p> zuruecktransformiert. Der
+    Aufwand ist daher unabhaengig von N.
+
+    Parameter:
+        N: Anzahl der Teilchen
+        delta_t: Zeitintervall
+        tabelle: Ergebnis von `einteilchen_tabelle` (wird sonst berechnet)
+        anz: Anzahl der Gitterpunkte (gerade)
+        breite: halbe Breite des Gitters in Standardabweichungen von p;
+            Wahrscheinlichkeit ausserhalb wird periodisch zurueckgefaltet
+    Rueckgabe:
+        p: aequidistantes Druckgitter um <p>
+        dichte: Wahrscheinlichkeitsdichte auf dem Gitter (fuer kleine N
+            enthaelt sie die Masse bei p = 0 als schmale Spitze)
+    """
+    if tabelle is None:
+        tabelle = einteilchen_tabelle(delta_t)
+    mittel = tabelle["mittel"]
+    dp = 2*breite*tabelle["sigma"]/np.sqrt(N)/anz
+    p = mittel + (np.arange(anz) - anz//2)*dp
+
+    m = np.fft.fftfreq(anz, 1/anz)           # ganzzahlige Frequenzindizes
+    s = 2*np.pi*m/(anz*dp)/N                 # Frequenzen fuer ein Teilchen
+    phase = np.outer(s, tabelle["w"] - mittel)
+    # phi_w(s)*exp(-i*s*<w>) - 1 ohne Ausloeschung fuer kleine s:
+    re = np.sum(tabelle["masse"]*-2*np.sin(phase/2)**2, axis=1)
+    im = np.sum(tabelle["masse"]*np.sin(phase), axis=1)
+    # log(1 + z) genau auch fuer sehr kleine |z| (np.log1p ist fuer kom-
+    # plexe Zahlen nicht genau):
+    log_phi = 0.5*np.log1p(2*re + re**2 + im**2) + 1j*np.arctan2(im, 1 + re)
+    phi_p = np.exp(N*log_phi)
+    dichte = np.real(np.fft.fft(phi_p*(-1.0)**m))/(anz*dp)
+    return p, dichte
@@ -0,0 +1,192 @@
+"""Reproduzierbare, parallele Monte-Carlo-Rechnungen.
+
+Die Realisierungen werden in Bloecke fester Groesse aufgeteilt. Jeder Block
+erhaelt einen eigenen, unabhaengigen Zufallsstrom (Kind einer gemeinsamen
+np.random.SeedSequence) und liefert nur suffiziente Statistiken (Anzahl,
+Mittelwert, Summe der Abweichungsquadrate, Histogramm mit festen Bins). Die
+Bloecke werden in einem Prozess-Pool berechnet und in ihrer festen Reihen-
+folge exakt zusammengefuehrt. Fuer einen gegebenen Seed ist das Ergebnis
+daher bitgenau unabhaengig von der Anzahl der Prozesse.
+"""
+
+import multiprocessing
+import os
+import numpy as np
+
+
+def statistik_block(werte, kanten):
+    """Berechne die suffizienten Statistiken eines Blocks von Werten.
+
+    Parameter:
+        werte: Array der Werte
+        kanten: feste Bin-Kanten des Histogramms (None: kein Histogramm)
+    Rueckgabe:
+        statistik: dict mit "n", "mittel", "m2" (Summe der Abweichungs-
+            quadrate), "min", "max", "kanten", "anz" (Histogramm),
+            "unter" und "ueber" (Werte ausserhalb der Bins)
+    """
+    mittel = np.mean(werte) if len(werte) > 0 else 0.0
+    statistik = {"n": len(werte), "mittel": mittel,
+                 "m2": np.sum((werte - mittel)**2),
+                 "min": np.min(werte, initial=np.inf),
+                 "max": np.max(werte, initial=-np.inf),
+                 "kanten": kanten, "anz": np.zeros(0, dtype=int),
+                 "unter": 0, "ueber": 0}
+    if kanten is not None:
+        statistik["anz"] = np.histogram(werte, bins=kanten)[0]
+        statistik["unter"] = np.sum(werte < kanten[0])
+        statistik["ueber"] = np.sum(werte > kanten[-1])
+    return statistik
+
+
+def statistik_vereinen(a, b):
+    """Fuehre zwei Statistiken exakt zusammen (Chan et al.).
+
+    Mit n = n_a + n_b und delta = mittel_b - mittel_a gilt
+        mittel = mittel_a + delta*n_b/n,
+        m2 = m2_a + m2_b + delta**2 * n_a*n_b/n.
+
+    Parameter:
+        a, b: Statistiken aus `statistik_block` (gleiche Bin-Kanten)
+    Rueckgabe:
+        statistik: zusammengefuehrte Statistik
+    """
+    n = a["n"] + b["n"]
+    if n == 0:
+        return a
+    delta = b["mittel"] - a["mittel"]
+    return {"n": n, "mittel": a["mittel"] + delta*b["n"]/n,
+            "m2": a["m2"] + b["m2"] + delta**2 * a["n"]*b["n"]/n,
+            "min": min(a["min"], b["min"]), "max": max(a["max"], b["max"]),
+            "kanten": a["kanten"], "anz": a["anz"] + b["anz"],
+            "unter": a["unter"] + b["unter"], "ueber": a["ueber"] + b["ueber"]}
+
+
+def statistiken_vereinen(a, b):
+    """Fuehre zwei (verschachtelte) Listen von Statistiken elementweise
+    zusammen, z.B. eine Statistik pro Ausgabezeit.
+    """
+    if isinstance(a, dict):
+        return statistik_vereinen(a, b)
+    return [statistiken_vereinen(a_i, b_i) for a_i, b_i in zip(a, b)]
+
+
+def statistik_auswerten(statistik):
+    """Berechne Mittelwert, Standardabweichung und Histogramm-Dichte.
+
+    Parameter:
+        statistik: Statistik aus `statistik_block`/`statistik_vereinen`
+    Rueckgabe:
+        mittel: Mittelwert
+        sigma: Standardabweichung (mit 1/(n-1))
+        dichte: normierte Haeufigkeitsdichte je Bin (bezogen auf alle n
+            Werte, also auch auf die ausserhalb der Bins); None ohne
+            Histogramm
+    """
+    n = statistik["n"]
+    sigma = np.sqrt(statistik["m2"]/(n - 1)) if n > 1 else 0.0
+    dichte = None
+    if statistik["kanten"] is not None:
+        dichte = statistik["anz"] / (max(n, 1)*np.diff(statistik["kanten"]))
+    return statistik["mittel"], sigma, dichte
+
+
+def bloecke_aufteilen(R, blockgroesse, seed=None):
+    """Teile R Realisierungen in Bloecke mit je eigenem Zufallsstrom auf.
+
+    Die Aufteilung haengt nur von R und blockgroesse ab, nicht von der Zahl
+    der Prozesse.
+
+    Parameter:
+        R: Anzahl der Realisierungen
+        blockgroesse: Anzahl der Realisierungen pro Block
+        seed: Startwert (int) oder None fuer einen zufaelligen Startwert
+    Rueckgabe:
+        auftraege: Liste von (anz, SeedSequence) je Block
+        entropie: Startwert, mit dem sich die Rechnung wiederholen laesst
+    """
+    wurzel = np.random.SeedSequence(seed)
+    anzahlen = [min(blockgroesse, R - start)
+                for start in range(0, R, blockgroesse)]
+    return list(zip(anzahlen, wurzel.spawn(len(anzahlen)))), wurzel.entropy
+
+
+def parallel_ausfuehren(funktion, auftraege, prozesse=None,
+                        vereinen=statistiken_vereinen):
+    """Berechne funktion(auftrag) fuer alle Auftraege, ggf. im Prozess-Pool,
+    und fuehre die Ergebnisse in der Reihenfolge der Auftraege zusammen.
+
+    Parameter:
+        funktion: Funktion eines Auftrags (auf Modulebene definiert oder
+            functools.partial davon, damit sie uebertragbar ist)
+        auftraege: Liste der Auftraege, z.B. aus `bloecke_aufteilen`
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+        vereinen: Funktion vereinen(a, b) zum Zusammenfuehren
+    Rueckgabe:
+        ergebnis: zusammengefuehrtes Ergebnis aller Auftraege
+    """
+    if prozesse is None:
+        prozesse = os.cpu_count() or 1
+    if prozesse == 1 or len(auftraege) == 1:
+        return _zusammenfuehren(map(funktion, auftraege), vereinen)
+    with multiprocessing.Pool(prozesse) as pool:
+        # imap liefert die Ergebnisse in der Reihenfolge der Auftraege:
+        return _zusammenfuehren(pool.imap(funktion, auftraege), vereinen)
+
+
+def abschnittsweise_ausfuehren(funktion, zustaende, abschnitte, prozesse=None,
+                               vereinen=statistiken_vereinen):
+    """Fuehre Auftraege mit Zustand abschnittsweise aus und liefere das
+    zusammengefuehrte Ergebnis jedes Abschnitts, sobald es vorliegt.
+
+    funktion((zustand, abschnitt)) gibt (neuer Zustand, Ergebnis) zurueck;
+    der neue Zustand eines Auftrags wird an den naechsten Abschnitt weiter-
+    gegeben. Ein Auftrag wird fuer den naechsten Abschnitt neu gestartet,
+    sobald sein Ergebnis abgeholt ist; waehrend der Aufrufer das Ergebnis
+    eines Abschnitts verarbeitet, wird also schon der naechste berechnet.
+    Die Ergebnisse werden in der Reihenfolge der Zustaende zusammengefuehrt
+    (reproduzierbar wie bei `parallel_ausfuehren`).
+
+    Parameter:
+        funktion: Funktion eines Auftrags (uebertragbar, siehe
+            `parallel_ausfuehren`)
+        zustaende: Anfangszustaende der Auftraege, z.B. aus
+            `bloecke_aufteilen`
+        abschnitte: Liste der Abschnitte (z.B. Ausgabezeiten)
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+        vereinen: Funktion vereinen(a, b) zum Zusammenfuehren
+    Rueckgabe:
+        Generator des zusammengefuehrten Ergebnisses je Abschnitt
+    """
+    if prozesse is None:
+        prozesse = os.cpu_count() or 1
+    zustaende = list(zustaende)
+    if prozesse == 1 or len(zustaende) == 1:
+        for abschnitt in abschnitte:
+            ergebnisse = [funktion((zustand, abschnitt))
+                          for zustand in zustaende]
+            zustaende = [zustand for zustand, _teil in ergebnisse]
+            yield _zusammenfuehren((teil for _zustand, teil in ergebnisse),
+                                   vereinen)
+        return
+    abschnitte = list(abschnitte)
+    with multiprocessing.Pool(prozesse) as pool:
+        laufend = [pool.apply_async(funktion, ((zustand, abschnitte[0]),))
+                   for zustand in zustaende]
+        for nummer in range(len(abschnitte)):
+            teile = []
+            for i, auftrag in enumerate(laufend):
+                zustand, teil = auftrag.get()
+                if nummer + 1 < len(abschnitte):     # gleich weiterrechnen
+                    laufend[i] = pool.apply_async(
+                        funktion, ((zustand, abschnitte[nummer + 1]),))
+                teile.append(teil)
+            yield _zusammenfuehren(teile, vereinen)
+
+
+def _zusammenfuehren(ergebnisse, vereinen):
+    """Fuehre die Ergebnisse der Reihe nach zusammen."""
+    ergebnis = None
+    for teil in ergebnisse:
+        ergebnis = teil if ergebnis is None else vereinen(ergebnis, teil)
+    return ergebnis
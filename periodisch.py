@@ -0,0 +1,478 @@
+"""Bandstruktur von Teilchen in 1D periodischen Potentialen.
+
+Die Eigenwerte E_n(k) werden entweder wie in 7_1 mit der Ortsraumdiskreti-
+sierung einer Periode und komplexen Eckelementen (Bloch-Phase k) berechnet
+oder in einer Basis ebener Wellen, in der ein glattes Potential nur wenige
+Fourier-Moden koppelt (Bandmatrix).
+"""
+
+import functools
+import multiprocessing
+import os
+import numpy as np
+from scipy.linalg import eig_banded, eigh, eigvalsh
+import quantenmechanik as qm
+
+
+def kosinus_potential(x, A=1.0):
+    """Periodisches Potential V(x) = A*cos(2*pi*x) wie in 7_1.
+
+    Parameter:
+        x: Ortspunkte
+        A: Amplitude des Potentials
+    """
+    return A*np.cos(2*np.pi*x)
+
+
+def bloch_matrix(h_eff, x, v_werte, k):
+    """Baue die Matrix-Darstellung des Bloch-Hamilton-Operators.
+
+    Parameter:
+        h_eff: effektives hquer
+        x: Ortspunkte einer Periode
+        v_werte: Werte des Potentials an den Ortspunkten
+        k: Bloch-Phase
+    Rueckgabe:
+        h: komplexe N*N-Matrix
+    """
+    delta_x = x[1] - x[0]
+    N = len(x)
+    z = h_eff**2 / (2.0*delta_x**2)                        # Nebendiagonalelem.
+
+    h = np.zeros((N, N), dtype=complex)
+    diag = np.arange(N)
+    h[diag, diag] = v_werte + 2.0*z
+    h[diag[1:], diag[:-1]] = -z
+    h[diag[:-1], diag[1:]] = -z
+    h[0, -1] = -z * np.exp(-1j*k)                          # kompl. Eintraege
+    h[-1, 0] = -z * np.exp(+1j*k)                          # in den Ecken
+    return h
+
+
+def bloch_matrizen(h_eff, x, v_werte, k_werte):
+    """Liefere die Bloch-Matrizen fuer mehrere k als Generator.
+
+    Der k-unabhaengige Teil wird nur einmal aufgebaut, pro k werden nur die
+    beiden komplexen Eckelemente neu gesetzt. Es wird immer dasselbe Array
+    geliefert; es darf also nicht ueber den naechsten Schritt hinaus
+    gespeichert oder direkt (overwrite_a) zerlegt werden.
+
+    Parameter:
+        h_eff: effektives hquer
+        x: Ortspunkte einer Periode
+        v_werte: Werte des Potentials an den Ortspunkten
+        k_werte: Bloch-Phasen
+    Rueckgabe (pro k):
+        h: komplexe N*N-Matrix wie bei `bloch_matrix`
+    """
+    h = bloch_matrix(h_eff, x, v_werte, 0.0)
+    z = h_eff**2 / (2.0*(x[1] - x[0])**2)
+    for k in k_werte:
+        h[0, -1] = -z * np.exp(-1j*k)
+        h[-1, 0] = -z * np.exp(+1j*k)
+        yield h
+
+
+def _eigenwerte_block(argumente):
+    """Eigenwerte <= E_max fuer einen Block von k-Werten (Arbeitsprozess).
+
+    Rueckgabe: Liste der Eigenwert-Arrays (unterschiedliche Laenge je k)
+    """
+    h_eff, x, v_werte, k_block, E_max = argumente
+    return [eigvalsh(h, subset_by_value=(-np.inf, E_max), driver="evr")
+            for h in bloch_matrizen(h_eff, x, v_werte, k_block)]
+
+
+def _eigenwerte_index_block(argumente):
+    """Die `anz` niedrigsten Eigenwerte fuer einen Block von k-Werten."""
+    h_eff, x, v_werte, k_block, anz = argumente
+    return [eigvalsh(h, subset_by_index=(0, anz - 1), driver="evr")
+            for h in bloch_matrizen(h_eff, x, v_werte, k_block)]
+
+
+def _verteilen(funktion, h_eff, x, v_werte, k, parameter, prozesse):
+    """Berechne `funktion` blockweise fuer alle k, ggf. im Prozess-Pool."""
+    if prozesse is None:
+        prozesse = os.cpu_count() or 1
+    bloecke = np.array_split(np.asarray(k, dtype=float),
+                             max(1, min(len(k), 4*prozesse)))
+    auftraege = [(h_eff, x, v_werte, block, parameter) for block in bloecke]
+    if prozesse == 1:
+        ergebnisse = [funktion(auftrag) for auftrag in auftraege]
+    else:
+        with multiprocessing.Pool(prozesse) as pool:
+            ergebnisse = pool.map(funktion, auftraege)
+    return [ew for block in ergebnisse for ew in block]
+
+
+def bandstruktur(h_eff, x, V, k, E_max, prozesse=None):
+    """Berechne die Baender E_n(k), deren Minimum unterhalb von E_max liegt.
+
+    Es werden nur Eigenwerte (keine Eigenvektoren) und nur im benoetigten
+    Energiebereich berechnet; die k-Werte werden blockweise auf einen Pool
+    von Prozessen verteilt. Baender, die fuer einige k ueber E_max hinaus-
+    laufen, werden fuer diese k nachtraeglich ueber ihren Index bestimmt.
+
+    Parameter:
+        h_eff: effektives hquer
+        x: Ortspunkte einer Periode
+        V: Potential als Funktion einer Variable
+        k: Array der Bloch-Phasen
+        E_max: maximal betrachtete Energie
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+    Rueckgabe:
+        ew: Eigenwerte, ew[i, n] = E_n(k[i]) (Groesse N_k*anz)
+    """
+    v_werte = V(x)
+    ew_k = _verteilen(_eigenwerte_block, h_eff, x, v_werte, k, E_max,
+                      prozesse)
+    anz = max(len(ew) for ew in ew_k)
+
+    fehlend = [i for i, ew in enumerate(ew_k) if len(ew) < anz]
+    if fehlend:                              # Baender teils ueber E_max
+        nachtrag = _verteilen(_eigenwerte_index_block, h_eff, x, v_werte,
+                              np.asarray(k)[fehlend], anz, prozesse)
+        for i, ew in zip(fehlend, nachtrag):
+            ew_k[i] = ew
+    return np.array(ew_k)
+
+
+def _eigenpaare(h, x, anz):
+    """Die `anz` niedrigsten Eigenwerte und WS-normierten Eigenvektoren der
+    Bloch-Matrix h."""
+    ew, ef = eigh(h, subset_by_index=(0, anz - 1), driver="evr")
+    return ew, ef/np.sqrt(x[1] - x[0])
+
+
+def _eigenpaare_block(argumente):
+    """Eigenpaare fuer einen Block von k-Werten (Arbeitsprozess)."""
+    h_eff, x, v_werte, k_block, anz = argumente
+    return [_eigenpaare(h, x, anz)
+            for h in bloch_matrizen(h_eff, x, v_werte, k_block)]
+
+
+def band_cache_erstellen(h_eff, x, V, k, anz, prozesse=None):
+    """Berechne Eigenwerte und die `anz` niedrigsten Eigenvektoren auf einem
+    k-Gitter als Grundlage fuer `band_cache_abfrage`.
+
+    Parameter:
+        h_eff: effektives hquer
+        x: Ortspunkte einer Periode
+        V: Potential als Funktion einer Variable
+        k: aufsteigend sortiertes Array der Bloch-Phasen
+        anz: Anzahl der Baender
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+    Rueckgabe:
+        cache: dict mit k-Gitter, Eigenwerten "ew" (N_k*anz), Eigenvektoren
+            "ef" (N_k*N*anz), den Parametern des Problems und Zaehlern fuer
+            Treffer und Fehlversuche
+    """
+    v_werte = V(x)
+    paare = _verteilen(_eigenpaare_block, h_eff, x, v_werte, k, anz,
+                       prozesse)
+    return {"k": np.asarray(k, dtype=float),
+            "ew": np.array([ew for ew, _ef in paare]),
+            "ef": np.array([ef for _ew, ef in paare]),
+            "h_eff": h_eff, "x": x, "v_werte": v_werte, "anz": anz,
+            "treffer": 0, "fehlversuche": 0}
+
+
+def band_cache_laden(h_eff, x, V, k, anz, prozesse=None, cache_dir=None):
+    """Wie `band_cache_erstellen`, aber mit persistentem Disk-Cache.
+
+    Eigenwerte und Eigenvektoren werden nur beim ersten Aufruf fuer ein
+    Problem (Ortsgitter, h_eff, Stencil, Potential, k-Gitter, anz) berech-
+    net und mit `qm.cache_speichern` abgelegt; danach werden sie geladen
+    (Eigenvektoren als Memory-Map).
+
+    Parameter: wie `band_cache_erstellen`, zusaetzlich
+        cache_dir: Cache-Verzeichnis (Default: qm.CACHE_VERZEICHNIS)
+    Rueckgabe:
+        cache: dict wie bei `band_cache_erstellen`
+    """
+    v_werte = V(x)
+    schluessel = qm.cache_schluessel("band_cache", qm.STENCIL, x,
+                                     np.float64(h_eff), v_werte,
+                                     np.asarray(k, dtype=float),
+                                     np.int64(anz))
+    gespeichert = qm.cache_laden(schluessel, ["ew", "ef"],
+                                 cache_dir=cache_dir, mmap_namen=["ef"])
+    if gespeichert is None:
+        cache = band_cache_erstellen(h_eff, x, V, k, anz, prozesse)
+        qm.cache_speichern(schluessel, {"ew": cache["ew"], "ef": cache["ef"]},
+                           cache_dir=cache_dir)
+        return cache
+    return {"k": np.asarray(k, dtype=float), "ew": gespeichert[0],
+            "ef": gespeichert[1], "h_eff": h_eff, "x": x,
+            "v_werte": v_werte, "anz": anz, "treffer": 0, "fehlversuche": 0}
+
+
+def band_cache_abfrage(cache, k, tol=1e-2):
+    """Bestimme Eigenwerte und Eigenvektoren bei beliebigem k aus dem Cache.
+
+    Zwischen den benachbarten Gitterpunkten k_i <= k <= k_(i+1) werden die
+    Eigenwerte linear interpoliert. Die Eigenvektoren bei k_(i+1) werden
+    vorher in der Phase an die bei k_i angeglichen (Eigenvektoren sind nur
+    bis auf einen Phasenfaktor bestimmt), dann interpoliert und neu
+    normiert. Ist der Betrag eines Ueberlapps <ef_i|ef_(i+1)> kleiner als
+    1 - tol (z.B. bei fast entarteten Baendern) oder liegt k ausserhalb des
+    Gitters, wird direkt diagonalisiert.
+
+    Parameter:
+        cache: dict aus `band_cache_erstellen`
+        k: Bloch-Phase
+        tol: erlaubte Abweichung der Ueberlapps von 1
+    Rueckgabe:
+        ew: Eigenwerte E_n(k) (Array der Laenge anz)
+        ef: Eigenvektoren, ef[:, n] (Groesse N*anz)
+    """
+    gitter = cache["k"]
+    delta_x = cache["x"][1] - cache["x"][0]
+    i = np.searchsorted(gitter, k) - 1
+    if 0 <= i < len(gitter) - 1:
+        ef_links, ef_rechts = cache["ef"][i], cache["ef"][i + 1]
+        ueberlapp = delta_x * np.sum(np.conjugate(ef_links)*ef_rechts, axis=0)
+        if np.all(np.abs(ueberlapp) >= 1.0 - tol):
+            cache["treffer"] += 1
+            w = (k - gitter[i]) / (gitter[i + 1] - gitter[i])
+            ew = (1.0 - w)*cache["ew"][i] + w*cache["ew"][i + 1]
+            phase = np.conjugate(ueberlapp) / np.abs(ueberlapp)
+            ef = (1.0 - w)*ef_links + w*ef_rechts*phase
+            ef /= np.sqrt(delta_x * np.sum(np.abs(ef)**2, axis=0))
+            return ew, ef
+
+    cache["fehlversuche"] += 1
+    return _eigenpaare(bloch_matrix(cache["h_eff"], cache["x"],
+                                    cache["v_werte"], k),
+                       cache["x"], cache["anz"])
+
+
+def bloch_fortsetzung(ef, k, n_per, auswahl=None):
+    """Setze ausgewaehlte Eigenfunktionen periodisch mit Bloch-Phase fort.
+
+    In der n-ten Periode gilt psi(x + n) = exp(i*k*n) * psi(x). Es wird nur
+    ein kompaktes (n_per*N, anz)-Array der ausgewaehlten Eigenfunktionen
+    aufgebaut, statt die ganze Eigenvektormatrix per np.tile zu
+    vervielfachen.
+
+    Parameter:
+        ef: Eigenvektoren einer Periode, ef[:, i] (Groesse N*M)
+        k: Bloch-Phase
+        n_per: Anzahl der Perioden
+        auswahl: Indizes der fortzusetzenden Eigenfunktionen (Default: alle)
+    Rueckgabe:
+        ef_per: fortgesetzte Eigenfunktionen, ef_per[:, j] zu auswahl[j]
+            (Groesse (n_per*N)*anz)
+    """
+    if auswahl is not None:
+        ef = ef[:, auswahl]
+    phasen = np.exp(1j*k*np.arange(n_per))
+    return (phasen[:, np.newaxis, np.newaxis] * ef[np.newaxis]).reshape(
+        n_per*ef.shape[0], ef.shape[1])
+
+
+def fourier_koeffizienten(V, a=1.0, n_fft=256, tol=1e-12):
+    """Berechne die Fourier-Koeffizienten eines periodischen Potentials.
+
+    Es gilt V(x) = sum_m V_m * exp(2*pi*i*m*x/a) mit V_(-m) = conj(V_m)
+    (reelles Potential). Koeffizienten, die betragsmaessig kleiner als
+    tol*max|V_m| sind, werden abgeschnitten.
+
+    Parameter:
+        V: Potential als Funktion einer Variable (Periode a)
+        a: Periodenlaenge
+        n_fft: Anzahl der Stuetzstellen fuer die FFT
+        tol: relative Schranke fuer vernachlaessigbare Koeffizienten
+    Rueckgabe:
+        v_m: Koeffizienten V_0, V_1, ..., V_M (M = hoechste Harmonische)
+    """
+    x = a * np.arange(n_fft) / n_fft
+    v_m = np.fft.fft(V(x))[:n_fft//2] / n_fft
+    wesentlich = np.nonzero(np.abs(v_m) > tol*np.max(np.abs(v_m)))[0]
+    if len(wesentlich) == 0:                 # V = 0
+        return v_m[:1]
+    return v_m[:wesentlich[-1] + 1]
+
+
+def _ebene_wellen_band(h_eff, v_m, k, n_moden, a):
+    """Untere Bandform des Bloch-Hamilton-Operators in ebenen Wellen.
+
+    Basis: exp(i*(k + 2*pi*G)*x/a) mit G = -n_moden, ..., n_moden.
+    """
+    G = np.arange(-n_moden, n_moden + 1)
+    breite = min(len(v_m) - 1, 2*n_moden)
+    band = np.zeros((breite + 1, len(G)), dtype=complex)
+    band[0] = 0.5*h_eff**2 * ((k + 2.0*np.pi*G)/a)**2 + np.real(v_m[0])
+    for m in range(1, breite + 1):
+        band[m, :len(G) - m] = v_m[m]                      # <G+m|V|G> = V_m
+    return band
+
+
+def ebene_wellen_bandstruktur(h_eff, V, k, anz, n_moden=16, a=1.0,
+                              n_fft=256):
+    """Berechne E_n(k) der niedrigsten Baender in ebenen Wellen.
+
+    Mit V(x) = sum_m V_m exp(2*pi*i*m*x/a) koppelt das Potential nur Moden,
+    deren Index sich um hoechstens die hoechste Harmonische M unterscheidet;
+    der Hamilton-Operator ist eine Bandmatrix der Breite M (fuer
+    V = A*cos(2*pi*x) tridiagonal). Pro k wird nur eine kleine Bandmatrix
+    der Dimension 2*n_moden+1 diagonalisiert.
+
+    Parameter:
+        h_eff: effektives hquer
+        V: Potential als Funktion einer Variable (Periode a)
+        k: Array der Bloch-Phasen (wie in 7_1, psi(x+a) = exp(i*k)*psi(x))
+        anz: Anzahl der Baender
+        n_moden: Moden G = -n_moden, ..., n_moden
+        a: Periodenlaenge
+        n_fft: Anzahl der Stuetzstellen fuer die Fourier-Koeffizienten
+    Rueckgabe:
+        ew: Eigenwerte, ew[i, n] = E_n(k[i]) (Groesse N_k*anz)
+    """
+    v_m = fourier_koeffizienten(V, a, n_fft)
+    return np.array([eig_banded(_ebene_wellen_band(h_eff, v_m, kk, n_moden,
+                                                   a),
+                                lower=True, eigvals_only=True, select="i",
+                                select_range=(0, anz - 1))
+                     for kk in np.atleast_1d(k)])
+
+
+def bloch_funktionen(h_eff, V, k, anz, x, n_moden=16, a=1.0, n_fft=256):
+    """Berechne Bloch-Funktionen psi_(n,k)(x) aus der Ebene-Wellen-Basis.
+
+    Parameter:
+        h_eff: effektives hquer
+        V: Potential als Funktion einer Variable (Periode a)
+        k: Bloch-Phase (Skalar)
+        anz: Anzahl der Baender
+        x: Ortspunkte, an denen die Bloch-Funktionen ausgewertet werden
+            (beliebig viele Perioden, die Bloch-Phase ist enthalten)
+        n_moden: Moden G = -n_moden, ..., n_moden
+        a: Periodenlaenge
+        n_fft: Anzahl der Stuetzstellen fuer die Fourier-Koeffizienten
+    Rueckgabe:
+        ew: Eigenwerte E_n(k) (Array der Laenge anz)
+        ef: Bloch-Funktionen, ef[:, n], normiert auf eine Periode
+    """
+    v_m = fourier_koeffizienten(V, a, n_fft)
+    ew, c = eig_banded(_ebene_wellen_band(h_eff, v_m, k, n_moden, a),
+                       lower=True, select="i", select_range=(0, anz - 1))
+    G = np.arange(-n_moden, n_moden + 1)
+    wellen = np.exp(1j * np.outer(x, k + 2.0*np.pi*G) / a) / np.sqrt(a)
+    return ew, np.dot(wellen, c)
+
+
+def _histogramm_block(argumente):
+    """Histogramm der Eigenwerte eines k-Blocks (Arbeitsprozess)."""
+    h_eff, x, v_werte, k_block, kanten = argumente
+    anz = np.zeros(len(kanten) - 1, dtype=np.int64)
+    for h in bloch_matrizen(h_eff, x, v_werte, k_block):
+        ew = eigvalsh(h, subset_by_value=(kanten[0], kanten[-1]),
+                      driver="evr")
+        anz += np.histogram(ew, bins=kanten)[0]
+    return [anz]
+
+
+def zustandsdichte(h_eff, x, V, kanten, N_k=1000, prozesse=None):
+    """Berechne die Zustandsdichte D(E) auf einem dichten k-Gitter.
+
+    Die Eigenwerte im Energiebereich der Bins werden blockweise berechnet
+    und sofort in ein festes Histogramm einsortiert; es werden also nie alle
+    Eigenwerte gleichzeitig gespeichert.
+
+    Parameter:
+        h_eff: effektives hquer
+        x: Ortspunkte einer Periode
+        V: Potential als Funktion einer Variable
+        kanten: Bin-Kanten der Energie
+        N_k: Anzahl der k-Werte in der 1. Brillouin-Zone
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+    Rueckgabe:
+        dos: Zustaende pro Energie und Periode in jedem Bin
+            (Integral ueber E ergibt die Zahl der Baender im Bereich)
+    """
+    kanten = np.asarray(kanten, dtype=float)
+    # k-Gitter ohne doppelten Randpunkt (k = -pi und k = pi identisch):
+    k = np.linspace(-np.pi, np.pi, N_k, endpoint=False)
+    bloecke = _verteilen(_histogramm_block, h_eff, x, V(x), k, kanten,
+                         prozesse)
+    return np.sum(bloecke, axis=0) / (N_k * np.diff(kanten))
+
+
+def bandluecken(ew):
+    """Bestimme Lage und Breite der Bandluecken aus E_n(k).
+
+    Parameter:
+        ew: Eigenwerte, ew[i, n] = E_n(k[i]) (Groesse N_k*anz)
+    Rueckgabe:
+        unten: Oberkante von Band n (Array der Laenge anz-1)
+        oben: Unterkante von Band n+1
+        breite: Breite der Luecke (0, falls die Baender ueberlappen)
+    """
+    unten = np.max(ew[:, :-1], axis=0)
+    oben = np.min(ew[:, 1:], axis=0)
+    return unten, oben, np.maximum(oben - unten, 0.0)
+
+
+def _luecken_zeile(argumente):
+    """Bandluecken fuer alle h_eff bei einer Amplitude A (ein Disk-Cache-
+    Eintrag pro Zeile der Karte).
+    """
+    V, A, h_werte, N_k, anz, n_moden, cache_dir = argumente
+    V_A = functools.partial(V, A=A)
+    schluessel = qm.cache_schluessel(
+        "bandluecken", np.asarray(h_werte, dtype=float),
+        np.int64([N_k, anz, n_moden]), V_A(np.arange(256) / 256.0))
+    gespeichert = qm.cache_laden(schluessel, ["unten", "oben"],
+                                 cache_dir=cache_dir)
+    if gespeichert is not None:
+        return gespeichert
+
+    k = np.linspace(0.0, np.pi, N_k)         # E_n(k) = E_n(-k)
+    unten = np.empty((len(h_werte), anz - 1))
+    oben = np.empty((len(h_werte), anz - 1))
+    for j, h_eff in enumerate(h_werte):
+        ew = ebene_wellen_bandstruktur(h_eff, V_A, k, anz, n_moden)
+        unten[j], oben[j], _breite = bandluecken(ew)
+    qm.cache_speichern(schluessel, {"unten": unten, "oben": oben},
+                       cache_dir=cache_dir)
+    return unten, oben
+
+
+def bandluecken_karte(A_werte, h_werte, anz, V=kosinus_potential, N_k=64,
+                      n_moden=32, prozesse=None, cache_dir=None):
+    """Berechne die Bandluecken ueber einem (A, h_eff)-Parametergitter.
+
+    Jeder Parameterpunkt wird mit dem Ebene-Wellen-Loeser berechnet. Die
+    Ergebnisse einer Zeile (eine Amplitude A, alle h_eff) bilden einen
+    Eintrag im Disk-Cache, so dass unterbrochene Karten oder Karten mit
+    zusaetzlichen Amplituden nur die fehlenden Zeilen neu berechnen; die
+    Zahl der Cache-Zugriffe waechst dabei nur mit len(A_werte). Die Zeilen
+    werden auf einen Pool von Prozessen verteilt.
+
+    Parameter:
+        A_werte: Array der Amplituden
+        h_werte: Array der effektiven hquer
+        anz: Anzahl der betrachteten Baender (ergibt anz-1 Luecken)
+        V: Potential V(x, A) (Periode 1, auf Modulebene definiert)
+        N_k: Anzahl der k-Werte in [0, pi]
+        n_moden: Moden G = -n_moden, ..., n_moden
+        prozesse: Anzahl der Prozesse (Default: Anzahl der Kerne)
+        cache_dir: Cache-Verzeichnis (Default: qm.CACHE_VERZEICHNIS)
+    Rueckgabe:
+        unten, oben, breite: Unter- und Oberkante sowie Breite der Luecken,
+            jeweils Arrays der Groesse len(A_werte)*len(h_werte)*(anz-1)
+    """
+    if prozesse is None:
+        prozesse = os.cpu_count() or 1
+    auftraege = [(V, A, np.asarray(h_werte, dtype=float), N_k, anz, n_moden,
+                  cache_dir) for A in A_werte]
+    if prozesse == 1:
+        ergebnisse = [_luecken_zeile(auftrag) for auftrag in auftraege]
+    else:
+        with multiprocessing.Pool(prozesse) as pool:
+            ergebnisse = pool.map(_luecken_zeile, auftraege)
+
+    unten = np.array([u for u, _o in ergebnisse])
+    oben = np.array([o for _u, o in ergebnisse])
+    return unten, oben, np.maximum(oben - unten, 0.0)
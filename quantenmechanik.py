@@ -1,8 +1,18 @@
 """Berechnung von Eigenwerten und Eigenfunktionen der 1D Schroedingergleichung.
 """
 
+import hashlib
+import os
+import shutil
 import numpy as np
-from scipy.linalg import eigh
+from scipy.linalg import eigh, eigh_tridiagonal, eigvalsh_tridiagonal
+from scipy.linalg import get_lapack_funcs
+
+
+STENCIL = "3-Punkt"                       # Diskretisierung der 2. Ableitung
+CACHE_VERZEICHNIS = os.path.join(os.path.expanduser("~"), ".cache",
+                                 "quantenmechanik")
+CACHE_MAX_BYTES = 2 * 1024**3             # Obergrenze Cache-Groesse (2 GiB)
 
 
 def diskretisierung(xmin, xmax, N, retstep=False):
@@ -26,31 +36,411 @@ def diskretisierung(xmin, xmax, N, retstep=False):
         return x
 
 
-def diagonalisierung(hquer, x, V):
+def diagonalisierung(hquer, x, V, anz=None, dtype=None, fortran=False):
     """Berechne sortierte Eigenwerte und zugehoerige Eigenfunktionen.
 
     Parameter:
         hquer: effektives hquer
         x: Ortspunkte
         V: Potential als Funktion einer Variable
+        anz: falls angegeben, werden nur die `anz` niedrigsten Eigenwerte
+            und Eigenvektoren berechnet (Tridiagonal-Loeser, O(N*anz)
+            Speicher statt O(N**2))
+        dtype: Datentyp fuer `ef`, z.B. np.float32 (halber Speicher)
+        fortran: speichert `ef` spaltenweise zusammenhaengend
+            (Fortran-Ordnung), so dass jede Eigenfunktion ef[:, i] ein
+            zusammenhaengender Speicherblock ist
     Rueckgabe:
-        ew: sortierte Eigenwerte (Array der Laenge N)
-        ef: entsprechende Eigenvektoren, ef[:, i] (Groesse N*N)
+        ew: sortierte Eigenwerte (Array der Laenge N bzw. anz)
+        ef: entsprechende Eigenvektoren, ef[:, i] (Groesse N*N bzw. N*anz)
     """
     delta_x = x[1] - x[0]
     v_werte = V(x)                                         # Werte Potential
 
     N = len(x)
     z = hquer**2 / (2.0*delta_x**2)                        # Nebendiagonalelem.
-    h = (np.diag(v_werte + 2.0*z) +
-         np.diag(-z*np.ones(N-1), k=-1) +                  # Matrix-Darstellung
-         np.diag(-z*np.ones(N-1), k=1))                    # Hamilton-Operat.
+    if anz is None:
+        h = (np.diag(v_werte + 2.0*z) +
+             np.diag(-z*np.ones(N-1), k=-1) +              # Matrix-Darstellung
+             np.diag(-z*np.ones(N-1), k=1))                # Hamilton-Operat.
+        ew, ef = eigh(h)                                   # Diagonalisierung
+    else:                                                  # nur anz niedrigste
+        ew, ef = eigh_tridiagonal(v_werte + 2.0*z, -z*np.ones(N-1),
+                                  select="i", select_range=(0, anz-1))
 
-    ew, ef = eigh(h)                                       # Diagonalisierung
     ef = ef/np.sqrt(delta_x)                               # WS-Normierung
+    if dtype is not None:
+        ef = ef.astype(dtype, copy=False)
+    if fortran:
+        ef = np.asfortranarray(ef)
+    return ew, ef
+
+
+def cache_schluessel(*teile):
+    """Berechne einen inhaltsadressierten Schluessel fuer den Disk-Cache.
+
+    Parameter:
+        teile: Zahlen, Zeichenketten oder Arrays, die das Ergebnis eindeutig
+            festlegen (z.B. Ortsgitter, hquer, Stencil, Potentialwerte)
+    Rueckgabe:
+        schluessel: SHA-256 Hexdigest ueber alle Teile
+    """
+    sha = hashlib.sha256()
+    for teil in teile:
+        if isinstance(teil, str):
+            sha.update(b"s" + teil.encode("utf-8"))
+        else:
+            werte = np.ascontiguousarray(teil)
+            sha.update(b"a" + werte.dtype.str.encode("ascii") +
+                       str(werte.shape).encode("ascii"))
+            sha.update(werte.tobytes())
+    return sha.hexdigest()
+
+
+def cache_laden(schluessel, namen, cache_dir=None, mmap_namen=()):
+    """Lade Arrays eines Cache-Eintrags (oder None, falls nicht vorhanden).
+
+    Parameter:
+        schluessel: Schluessel aus `cache_schluessel`
+        namen: Namen der gespeicherten Arrays
+        cache_dir: Cache-Verzeichnis (Default: `CACHE_VERZEICHNIS`)
+        mmap_namen: Arrays, die nur als Memory-Map geoeffnet werden
+    Rueckgabe:
+        arrays: Liste der Arrays in der Reihenfolge von `namen` oder None
+    """
+    if cache_dir is None:
+        cache_dir = CACHE_VERZEICHNIS
+    eintrag = os.path.join(cache_dir, schluessel)
+    dateien = [os.path.join(eintrag, name + ".npy") for name in namen]
+    if not all(os.path.isfile(datei) for datei in dateien):
+        return None
+
+    os.utime(eintrag)                                      # fuer LRU-Ordnung
+    return [np.load(datei, mmap_mode="r" if name in mmap_namen else None)
+            for name, datei in zip(namen, dateien)]
+
+
+def cache_speichern(schluessel, arrays, cache_dir=None, max_bytes=None):
+    """Speichere Arrays als .npy-Dateien und begrenze die Cache-Groesse.
+
+    Der Eintrag wird zuerst in ein temporaeres Verzeichnis geschrieben und
+    dann umbenannt, damit parallel laufende Programme nie halbe Eintraege
+    sehen. Anschliessend werden die am laengsten nicht benutzten Eintraege
+    geloescht, bis der Cache hoechstens `max_bytes` gross ist (LRU).
+
+    Parameter:
+        schluessel: Schluessel aus `cache_schluessel`
+        arrays: dict {Name: Array}
+        cache_dir: Cache-Verzeichnis (Default: `CACHE_VERZEICHNIS`)
+        max_bytes: Obergrenze der Cache-Groesse (Default: `CACHE_MAX_BYTES`)
+    """
+    if cache_dir is None:
+        cache_dir = CACHE_VERZEICHNIS
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    os.makedirs(cache_dir, exist_ok=True)
+
+    eintrag = os.path.join(cache_dir, schluessel)
+    temp = "{}.tmp{}".format(eintrag, os.getpid())
+    os.makedirs(temp, exist_ok=True)
+    for name, werte in arrays.items():
+        np.save(os.path.join(temp, name + ".npy"), werte)
+    try:
+        os.rename(temp, eintrag)
+    except OSError:                                        # schon vorhanden
+        shutil.rmtree(temp, ignore_errors=True)
+
+    _cache_begrenzen(cache_dir, max_bytes, behalten=schluessel)
+
+
+def _cache_begrenzen(cache_dir, max_bytes, behalten=None):
+    """Loesche die aeltesten Cache-Eintraege, bis `max_bytes` erreicht ist."""
+    eintraege = []
+    for name in os.listdir(cache_dir):
+        pfad = os.path.join(cache_dir, name)
+        if not os.path.isdir(pfad) or ".tmp" in name:
+            continue
+        groesse = sum(os.path.getsize(os.path.join(pfad, datei))
+                      for datei in os.listdir(pfad))
+        eintraege.append((os.path.getmtime(pfad), groesse, name, pfad))
+
+    gesamt = sum(eintrag[1] for eintrag in eintraege)
+    for _zeit, groesse, name, pfad in sorted(eintraege):  # aelteste zuerst
+        if gesamt <= max_bytes:
+            break
+        if name == behalten:
+            continue
+        shutil.rmtree(pfad, ignore_errors=True)
+        gesamt -= groesse
+
+
+def diagonalisierung_cache(hquer, x, V, anz=None, dtype=None, cache_dir=None,
+                           max_bytes=None):
+    """Wie `diagonalisierung`, aber mit persistentem Disk-Cache.
+
+    Der Schluessel umfasst Ortsgitter, hquer, Stencil, die Werte des
+    Potentials sowie `anz` und `dtype`, so dass jede Aenderung einen neuen
+    Eintrag erzeugt. Die Eigenvektoren werden spaltenweise zusammenhaengend
+    (Fortran-Ordnung) gespeichert und als Memory-Map geladen.
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+        anz: falls angegeben, werden nur die `anz` niedrigsten Eigenpaare
+            berechnet und gespeichert (Tridiagonal-Loeser)
+        dtype: Datentyp fuer `ef`, z.B. np.float32 (halber Speicher auf
+            der Platte und beim Lesen)
+        cache_dir: Cache-Verzeichnis (Default: `CACHE_VERZEICHNIS`)
+        max_bytes: Obergrenze der Cache-Groesse (Default: `CACHE_MAX_BYTES`)
+    Rueckgabe:
+        ew: sortierte Eigenwerte (Array der Laenge N bzw. anz)
+        ef: entsprechende Eigenvektoren, ef[:, i] (Memory-Map, Groesse N*N
+            bzw. N*anz)
+    """
+    schluessel = cache_schluessel("diagonalisierung", STENCIL,
+                                  np.asarray(x, dtype=float),
+                                  np.float64(hquer),
+                                  np.asarray(V(x), dtype=float),
+                                  str(anz), np.dtype(dtype).str)
+    arrays = cache_laden(schluessel, ["ew", "ef"], cache_dir=cache_dir,
+                         mmap_namen=["ef"])
+    if arrays is not None:
+        return arrays[0], arrays[1]
+    ew, ef = diagonalisierung(hquer, x, V, anz=anz, dtype=dtype, fortran=True)
+    cache_speichern(schluessel, {"ew": ew, "ef": ef}, cache_dir=cache_dir,
+                    max_bytes=max_bytes)
     return ew, ef
 
 
+def hamilton_tridiagonal(hquer, x, V):
+    """Berechne Haupt- und Nebendiagonale des diskretisierten Hamilton-Op.
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+    Rueckgabe:
+        d: Hauptdiagonale (Array der Laenge N)
+        e: Nebendiagonale (Array der Laenge N-1)
+    """
+    delta_x = x[1] - x[0]
+    z = hquer**2 / (2.0*delta_x**2)                        # Nebendiagonalelem.
+    return V(x) + 2.0*z, -z*np.ones(len(x)-1)
+
+
+def tiefste_eigenwerte(hquer, x, V, anz):
+    """Berechne nur die `anz` niedrigsten Eigenwerte (ohne Eigenvektoren).
+
+    Die Tridiagonalstruktur des Hamilton-Operators wird direkt ausgenutzt,
+    die Matrix wird also nie voll aufgebaut.
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+        anz: Anzahl der gesuchten Eigenwerte
+    Rueckgabe:
+        ew: sortierte Eigenwerte (Array der Laenge anz)
+    """
+    d, e = hamilton_tridiagonal(hquer, x, V)
+    return eigvalsh_tridiagonal(d, e, select="i", select_range=(0, anz-1))
+
+
+def konvergenz_diagonalisierung(hquer, V, l, N, anz=5, tol=1e-6,
+                                l_schritt=0.25, max_schritte=12):
+    """Bestimme automatisch Intervall und Gitter fuer konvergierte Eigenwerte.
+
+    Zuerst wird bei festem Gitterabstand das Intervall [-l, l] schrittweise
+    um `l_schritt` (aufgerundet auf ganze Gitterabstaende) vergroessert,
+    bis sich die `anz` niedrigsten Eigenwerte um weniger als `tol` aendern
+    (Abschneidefehler der Box). Danach wird der Gitterabstand so lange
+    halbiert (N -> 2N+1), bis der per Richardson-Extrapolation geschaetzte
+    Diskretisierungsfehler unter `tol` liegt.
+    Der 3-Punkt-Stencil hat einen Fehler O(delta_x**2), also gilt
+        E_R = (4*E(delta_x/2) - E(delta_x)) / 3,
+        Fehler von E(delta_x/2) ~ |E(delta_x/2) - E(delta_x)| / 3.
+    Auf dem kleinsten Gitter, das die Toleranz erfuellt, werden abschliessend
+    die `anz` kontrollierten Eigenpaare mit dem Tridiagonal-Loeser berechnet
+    (O(N*anz) Speicher, keine volle Diagonalisierung).
+
+    Parameter:
+        hquer: effektives hquer
+        V: Potential als Funktion einer Variable
+        l: Start-Intervallgrenze
+        N: Start-Anzahl der Diskretisierungspunkte
+        anz: Anzahl der zu kontrollierenden niedrigsten Eigenwerte
+        tol: geforderte absolute Genauigkeit der Eigenwerte
+        l_schritt: Vergroesserung der Intervallgrenze pro Schritt
+            (wird auf ein Vielfaches des Gitterabstands aufgerundet)
+        max_schritte: Hoechstzahl der Schritte je Verfeinerungsart
+    Rueckgabe:
+        ergebnis: dict mit den Eintraegen
+            ew, ef: die `anz` niedrigsten Eigenwerte und Eigenvektoren auf
+                dem gewaehlten Gitter
+            x: gewaehltes Ortsgitter
+            N, l: gewaehlte Punktanzahl und Intervallgrenze
+            ew_extrapoliert: Richardson-extrapolierte niedrigste Eigenwerte
+            fehler_gitter: Fehlerabschaetzung der Diskretisierung (je EW)
+            fehler_box: Aenderung durch den letzten Intervallschritt (je EW)
+            konvergiert: True, falls `tol` in beiden Schritten erreicht wurde
+    """
+    konvergiert = True
+
+    # 1) Intervall bei festem Ortsgitterabstand vergroessern:
+    x, delta_x = diskretisierung(-l, l, N, retstep=True)
+    ew_alt = tiefste_eigenwerte(hquer, x, V, anz)
+    fehler_box = np.full(anz, np.inf)
+    m = max(int(np.ceil(l_schritt/delta_x - 1e-9)), 1)     # ganze Gitter-
+    for _schritt in range(max_schritte):                   # schritte, damit
+        l_neu = l + m*delta_x                              # delta_x gleich
+        N_neu = N + 2*m                                    # bleibt
+        x_neu = diskretisierung(-l_neu, l_neu, N_neu)
+        ew_neu = tiefste_eigenwerte(hquer, x_neu, V, anz)
+        fehler_box = np.abs(ew_neu - ew_alt)
+        if np.max(fehler_box) < tol:
+            break
+        l, N, ew_alt = l_neu, N_neu, ew_neu
+    else:
+        konvergiert = False
+
+    # 2) Gitter verfeinern, Fehler per Richardson-Extrapolation schaetzen:
+    ew_grob = ew_alt
+    fehler_gitter = np.full(anz, np.inf)
+    ew_extrapoliert = ew_grob
+    for _schritt in range(max_schritte):
+        N_fein = 2*N + 1                                   # delta_x halbiert
+        x_fein = diskretisierung(-l, l, N_fein)
+        ew_fein = tiefste_eigenwerte(hquer, x_fein, V, anz)
+        ew_extrapoliert = (4.0*ew_fein - ew_grob) / 3.0
+        fehler_gitter = np.abs(ew_fein - ew_extrapoliert)
+        N, ew_grob = N_fein, ew_fein
+        if np.max(fehler_gitter) < tol:
+            break
+    else:
+        konvergiert = False
+
+    x = diskretisierung(-l, l, N)
+    ew, ef = diagonalisierung(hquer, x, V, anz=anz)
+    return {"ew": ew, "ef": ef, "x": x, "N": N, "l": l,
+            "ew_extrapoliert": ew_extrapoliert,
+            "fehler_gitter": fehler_gitter, "fehler_box": fehler_box,
+            "konvergiert": konvergiert}
+
+
+def _sturm_anzahl(d, e, E):
+    """Zaehle per Sturm-Folge die Eigenwerte <= E einer Tridiagonalmatrix.
+
+    Die Pivots q_i der LDL^T-Zerlegung von (H - E) werden rekursiv berechnet,
+        q_0 = d_0 - E,   q_i = d_i - E - e_(i-1)**2 / q_(i-1),
+    die Anzahl negativer Pivots ist die Anzahl der Eigenwerte <= E (Sylve-
+    sters Traegheitssatz). Die Zaehlung laeuft in LAPACK (?stebz fuer das
+    Intervall (E_unten, E] mit E_unten unter der Gerschgorin-Schranke):
+    da die Toleranz groesser als das Intervall ist, wird nicht bisektiert,
+    es bleibt eine kompilierte O(N)-Zaehlung je Energie.
+    """
+    E = np.asarray(E, dtype=float)
+    stebz, = get_lapack_funcs(("stebz",), (d, e))
+    rand = np.zeros(len(d))                  # Gerschgorin-Radien
+    rand[:-1] += np.abs(e)
+    rand[1:] += np.abs(e)
+    E_unten = np.min(d - rand)
+    E_unten -= 1.0 + abs(E_unten)
+    if len(d) == 1:                          # Wrapper erwartet len(e) >= 1
+        e = np.zeros(1)
+
+    anz = np.zeros(E.shape, dtype=np.int64)
+    for i, E_i in np.ndenumerate(E):
+        if E_i > E_unten:
+            anz[i] = stebz(d, e, 1, E_unten, E_i, 0, 0, 2.0*(E_i - E_unten),
+                           "B")[0]
+    return int(anz) if E.ndim == 0 else anz
+
+
+def anzahl_zustaende(hquer, x, V, E):
+    """Berechne die Anzahl der Eigenzustaende mit Energie <= E.
+
+    Entspricht ``np.sum(ew <= E)``, benoetigt aber keine Diagonalisierung:
+    per Sturm-Folge kostet jede Energie nur O(N) Operationen. Fuer ein Array
+    von Energien ergibt sich die integrierte Zustandsdichte N(E).
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+        E: Energie (Skalar oder Array)
+    Rueckgabe:
+        anz: Anzahl der Eigenwerte <= E (gleiche Form wie `E`)
+    """
+    d, e = hamilton_tridiagonal(hquer, x, V)
+    return _sturm_anzahl(d, e, E)
+
+
+def eigenwert_bisektion(hquer, x, V, n, tol=None):
+    """Berechne einzelne Eigenwerte per Bisektion auf der Sturm-Folge.
+
+    Die Bisektion laeuft in LAPACK (?stebz ueber `eigvalsh_tridiagonal`),
+    der Aufwand je Eigenwert ist also O(N) in kompiliertem Code.
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+        n: Index (0 = Grundzustand) oder Array von Indizes der Eigenwerte
+        tol: absolute Genauigkeit (Default: relative Maschinengenauigkeit)
+    Rueckgabe:
+        ew: n-te(r) Eigenwert(e) (gleiche Form wie `n`)
+    """
+    d, e = hamilton_tridiagonal(hquer, x, V)
+    return _bisektion(d, e, np.asarray(n), tol)
+
+
+def _bisektion(d, e, n, tol):
+    """Bisektion (LAPACK) fuer die Eigenwerte mit Indizes `n`.
+
+    Zusammenhaengende Indexbereiche werden in einem Aufruf berechnet, damit
+    zwischen weit auseinander liegenden Indizes nichts unnoetig berechnet
+    wird.
+    """
+    indizes, rueck = np.unique(n, return_inverse=True)
+    ew = np.empty(len(indizes))
+    grenzen = np.flatnonzero(np.diff(indizes) > 1) + 1     # Luecken
+    for start, ende in zip(np.append(0, grenzen),
+                           np.append(grenzen, len(indizes))):
+        ew[start:ende] = eigvalsh_tridiagonal(
+            d, e, select="i",
+            select_range=(indizes[start], indizes[ende-1]),
+            tol=0.0 if tol is None else tol, lapack_driver="stebz")
+    return ew[rueck].reshape(n.shape)
+
+
+def spektralfenster(hquer, x, V, E_min, E_max, tol=None):
+    """Berechne alle Eigenwerte im Energiefenster (E_min, E_max].
+
+    Die Eigenwerte im Fenster werden per Bisektion in LAPACK (?stebz)
+    berechnet, der Index des ersten aus einer Sturm-Zaehlung. Damit lassen
+    sich z.B. Niveauabstaende ``np.diff(ew)`` fuer Niveaustatistiken auf
+    Gittern bestimmen, die fuer eine volle Diagonalisierung zu gross sind.
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+        E_min: untere Grenze des Energiefensters
+        E_max: obere Grenze des Energiefensters
+        tol: absolute Genauigkeit (Default: relative Maschinengenauigkeit)
+    Rueckgabe:
+        ew: sortierte Eigenwerte im Fenster
+        n: zugehoerige Indizes (Anzahl der Zustaende darunter)
+    """
+    d, e = hamilton_tridiagonal(hquer, x, V)
+    ew = eigvalsh_tridiagonal(d, e, select="v", select_range=(E_min, E_max),
+                              tol=0.0 if tol is None else tol,
+                              lapack_driver="stebz")
+    n_min = _sturm_anzahl(d, e, E_min)
+    return ew, n_min + np.arange(len(ew))
+
+
 def plot_eigenfunktionen(ax, ew, ef, x, V, width=1, Emax=0.15, fak=0.01,
                          betragsquadrat=False, basislinie=True, alpha=1.0,
                          title=None):
@@ -0,0 +1,470 @@
+"""Zeitentwicklung von Wellenpaketen in der 1D Schroedingergleichung.
+
+Neben der Entwicklung in der Eigenbasis (setzt eine Diagonalisierung voraus)
+gibt es Propagatoren direkt auf dem Ortsgitter, die auch fuer grosse Gitter
+und zeitabhaengige Potentiale V(x, t) geeignet sind.
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+import quantenmechanik as qm
+
+
+def entwicklungskoeffizienten(ef, phi_0, delta_x):
+    """Berechne die Entwicklungskoeffizienten c_n = <ef_n|phi_0>.
+
+    Parameter:
+        ef: Eigenvektoren, ef[:, n] (WS-normiert wie in `diagonalisierung`)
+        phi_0: Anfangswellenpaket auf dem Ortsgitter
+        delta_x: Ortsgitterabstand
+    Rueckgabe:
+        c: Entwicklungskoeffizienten (Array der Laenge ef.shape[1])
+    """
+    return delta_x * np.dot(np.conjugate(np.transpose(ef)), phi_0)
+
+
+def basis_abschneiden(ew, ef, c, eps):
+    """Beschraenke die Eigenbasis auf die signifikant besetzten Zustaende.
+
+    Es werden die Zustaende mit den groessten Gewichten |c_n|^2 behalten,
+    bis der Abschneidefehler
+        1 - sum_(behalten) |c_n|^2 / sum_(alle) |c_n|^2
+    kleiner als `eps` ist. Die Zeitentwicklung mit der verkleinerten Basis
+    kostet dann pro Zeitschritt O(N*K) statt O(N**2).
+
+    Parameter:
+        ew: Eigenwerte (Array der Laenge N)
+        ef: Eigenvektoren, ef[:, n] (Groesse N*N)
+        c: Entwicklungskoeffizienten (Array der Laenge N)
+        eps: geforderte Genauigkeit der Norm (0 <= eps < 1)
+    Rueckgabe:
+        ew_K, ef_K, c_K: Eigenwerte, Eigenvektoren und Koeffizienten der K
+            behaltenen Zustaende (nach Energie sortiert)
+        fehler: tatsaechlicher Abschneidefehler
+    """
+    gewichte = np.abs(c)**2
+    gesamt = np.sum(gewichte)
+    reihenfolge = np.argsort(gewichte)[::-1]               # groesste zuerst
+    rest = 1.0 - np.cumsum(gewichte[reihenfolge]) / gesamt
+    K = min(int(np.searchsorted(-rest, -eps, side="right")) + 1, len(c))
+    index = np.sort(reihenfolge[:K])
+    fehler = max(1.0 - np.sum(gewichte[index]) / gesamt, 0.0)
+    return ew[index], ef[:, index], c[index], fehler
+
+
+def phasenmatrix(ew, zeiten, hquer):
+    """Berechne die Phasenfaktoren exp(-i*E_n*t/hquer) fuer alle Zeiten.
+
+    Parameter:
+        ew: Eigenwerte (Array der Laenge K)
+        zeiten: betrachtete Zeiten (Array der Laenge T)
+        hquer: effektives hquer
+    Rueckgabe:
+        phasen: komplexe Matrix der Groesse K*T
+    """
+    return np.exp(-1j/hquer * np.outer(ew, zeiten))
+
+
+def zeitentwicklung(ew, ef, c, zeiten, hquer):
+    """Berechne phi(x, t) fuer alle Zeiten mit einem Matrix-Matrix-Produkt.
+
+    Statt fuer jede Zeit ein Matrix-Vektor-Produkt auszufuehren, wird die
+    (K, T)-Matrix c_n*exp(-i*E_n*t/hquer) aufgebaut und in einem einzigen
+    BLAS-Aufruf mit den Eigenvektoren multipliziert.
+
+    Parameter:
+        ew: Eigenwerte (Array der Laenge K)
+        ef: Eigenvektoren, ef[:, n] (Groesse N*K)
+        c: Entwicklungskoeffizienten (Array der Laenge K)
+        zeiten: betrachtete Zeiten (Array der Laenge T)
+        hquer: effektives hquer
+    Rueckgabe:
+        phi_t: Wellenpaket phi(x, t), phi_t[:, j] zur Zeit zeiten[j]
+            (Groesse N*T)
+    """
+    koeffizienten = c[:, np.newaxis] * phasenmatrix(ew, zeiten, hquer)
+    return np.dot(ef, koeffizienten)
+
+
+def zeitentwicklung_bloecke(ew, ef, c, zeiten, hquer, blockgroesse=64):
+    """Liefere phi(x, t) blockweise als Generator (begrenzter Speicher).
+
+    Parameter:
+        ew: Eigenwerte (Array der Laenge K)
+        ef: Eigenvektoren, ef[:, n] (Groesse N*K)
+        c: Entwicklungskoeffizienten (Array der Laenge K)
+        zeiten: betrachtete Zeiten (Array der Laenge T)
+        hquer: effektives hquer
+        blockgroesse: Anzahl der Zeiten pro Block
+    Rueckgabe (pro Block):
+        zeiten_block: Zeiten des Blocks
+        phi_block: phi(x, t) fuer diese Zeiten (Groesse N*len(zeiten_block))
+    """
+    zeiten = np.asarray(zeiten)
+    for start in range(0, len(zeiten), blockgroesse):
+        zeiten_block = zeiten[start:start + blockgroesse]
+        yield zeiten_block, zeitentwicklung(ew, ef, c, zeiten_block, hquer)
+
+
+def matrixelemente(ef, x, hquer, x_trenn=0.0):
+    """Berechne Matrixelemente von Observablen in der Eigenbasis.
+
+    Die Matrixelemente werden einmalig berechnet (Aufwand O(N*K**2)),
+    danach kostet jeder Erwartungswert nur noch O(K**2) pro Zeit,
+    unabhaengig von der Zahl N der Ortspunkte.
+
+    Parameter:
+        ef: Eigenvektoren, ef[:, n] (Groesse N*K)
+        x: Ortspunkte
+        hquer: effektives hquer
+        x_trenn: Trennstelle der beiden Mulden fuer die Projektoren
+    Rueckgabe:
+        matrizen: dict mit den (K*K)-Matrizen
+            "x", "x2": Ort und Ortsquadrat
+            "p": Impuls -i*hquer*d/dx (zentrale Differenzen, Dirichlet-Rand)
+            "links", "rechts": Projektoren auf x < x_trenn bzw. x >= x_trenn
+    """
+    delta_x = x[1] - x[0]
+    ef_h = np.conjugate(np.transpose(ef))
+
+    ableitung = np.zeros(ef.shape, dtype=np.result_type(ef, 1.0))
+    ableitung[1:-1] = (ef[2:] - ef[:-2]) / (2.0*delta_x)   # zentr. Differenz
+    ableitung[0] = ef[1] / (2.0*delta_x)                   # psi = 0 ausserhalb
+    ableitung[-1] = -ef[-2] / (2.0*delta_x)
+
+    links = x < x_trenn
+    return {"x": delta_x * np.dot(ef_h, x[:, np.newaxis] * ef),
+            "x2": delta_x * np.dot(ef_h, (x**2)[:, np.newaxis] * ef),
+            "p": -1j*hquer*delta_x * np.dot(ef_h, ableitung),
+            "links": delta_x * np.dot(ef_h[:, links], ef[links]),
+            "rechts": delta_x * np.dot(ef_h[:, ~links], ef[~links])}
+
+
+def beobachtungsgroessen(ew, c, matrizen, zeiten, hquer, blockgroesse=4096):
+    """Berechne Zeitreihen von Erwartungswerten ohne phi(x, t) aufzubauen.
+
+    Mit a_n(t) = c_n*exp(-i*E_n*t/hquer) gilt
+        <A>(t) = sum_nm conj(a_n(t)) * A_nm * a_m(t),
+    die Autokorrelation ist
+        <phi_0|phi(t)> = sum_n |c_n|^2 * exp(-i*E_n*t/hquer).
+    Die Zeiten werden blockweise abgearbeitet, so dass auch sehr lange
+    Zeitreihen mit begrenztem Speicher berechnet werden koennen.
+
+    Parameter:
+        ew: Eigenwerte (Array der Laenge K)
+        c: Entwicklungskoeffizienten (Array der Laenge K)
+        matrizen: dict {Name: (K*K)-Matrix}, z.B. aus `matrixelemente`
+        zeiten: betrachtete Zeiten (Array der Laenge T)
+        hquer: effektives hquer
+        blockgroesse: Anzahl der Zeiten pro Block
+    Rueckgabe:
+        reihen: dict {Name: reelle Zeitreihe der Laenge T} fuer alle
+            Matrizen sowie "norm" und "autokorrelation" (komplex)
+    """
+    zeiten = np.asarray(zeiten)
+    reihen = {name: np.zeros(len(zeiten)) for name in matrizen}
+    reihen["norm"] = np.zeros(len(zeiten))
+    reihen["autokorrelation"] = np.zeros(len(zeiten), dtype=complex)
+
+    gewichte = np.abs(c)**2
+    for start in range(0, len(zeiten), blockgroesse):
+        block = slice(start, start + blockgroesse)
+        phasen = phasenmatrix(ew, zeiten[block], hquer)
+        a = c[:, np.newaxis] * phasen                      # a_n(t), K*T
+        a_konj = np.conjugate(a)
+        for name, matrix in matrizen.items():
+            reihen[name][block] = np.real(np.sum(a_konj * np.dot(matrix, a),
+                                                 axis=0))
+        reihen["norm"][block] = np.sum(np.abs(a)**2, axis=0)
+        reihen["autokorrelation"][block] = np.dot(gewichte, phasen)
+    return reihen
+
+
+def angetriebenes_potential(V, B, omega):
+    """Gib das angetriebene Potential V(x) + x*B*sin(omega*t) zurueck.
+
+    Parameter:
+        V: statisches Potential als Funktion einer Variable
+        B: Amplitude des Antriebs
+        omega: Kreisfrequenz des Antriebs
+    Rueckgabe:
+        V_t: Potential als Funktion V_t(x, t)
+    """
+    return lambda x, t: V(x) + x*B*np.sin(omega*t)
+
+
+def _potential_werte(V, x, t, zeitabhaengig):
+    """Werte des (eventuell zeitabhaengigen) Potentials zur Zeit t."""
+    if zeitabhaengig:
+        return V(x, t)
+    return V(x)
+
+
+def _teilschritte(zeiten, dt):
+    """Zerlege die Intervalle zwischen Ausgabezeiten in gleich lange Schritte.
+
+    Rueckgabe (pro Intervall): Startzeit, Schrittweite, Anzahl der Schritte
+    """
+    for t_start, t_ende in zip(zeiten[:-1], zeiten[1:]):
+        anz = max(int(np.ceil((t_ende - t_start)/dt - 1e-12)), 1)
+        yield t_start, (t_ende - t_start)/anz, anz
+
+
+# Gewichte der Yoshida-Komposition (4. Ordnung aus drei Strang-Schritten):
+_YOSHIDA_W1 = 1.0 / (2.0 - 2.0**(1.0/3.0))
+_YOSHIDA_W0 = -2.0**(1.0/3.0) / (2.0 - 2.0**(1.0/3.0))
+
+
+def _bloecke(folge, blockgroesse):
+    """Fasse (t, phi)-Paare eines Generators zu Zeitbloecken zusammen.
+
+    Rueckgabe (pro Block): wie bei `zeitentwicklung_bloecke`
+    """
+    zeiten_block, phi_block = [], []
+    for t, phi in folge:
+        zeiten_block.append(t)
+        phi_block.append(phi)
+        if len(zeiten_block) == blockgroesse:
+            yield np.array(zeiten_block), np.transpose(phi_block)
+            zeiten_block, phi_block = [], []
+    if zeiten_block:
+        yield np.array(zeiten_block), np.transpose(phi_block)
+
+
+def split_operator_bloecke(phi_0, x, V, zeiten, hquer, dt, ordnung=2,
+                           zeitabhaengig=False, kinetik=qm.STENCIL,
+                           blockgroesse=64):
+    """Split-Operator-Propagation mit FFT, liefert phi(x, t) blockweise als
+    Generator (wie `zeitentwicklung_bloecke`).
+
+    Ein Strang-Schritt (2. Ordnung) lautet
+        phi -> exp(-i*V*dt/(2*hquer)) F^-1 exp(-i*T(k)*dt/hquer) F
+               exp(-i*V*dt/(2*hquer)) phi,
+    fuer ordnung=4 werden drei Strang-Schritte nach Yoshida kombiniert. Jeder
+    Schritt kostet O(N log N), eine Diagonalisierung ist nicht noetig. Die
+    FFT setzt periodische Randbedingungen auf dem Ortsgitter voraus; das
+    Intervall muss also (wie bei der Kastendiskretisierung) so gross gewaehlt
+    werden, dass das Wellenpaket den Rand nicht erreicht.
+
+    Die kinetische Energie T(k) ist per Default die Dispersion des 3-Punkt-
+    Stencils, T(k) = hquer**2 * (2 - 2*cos(k*delta_x)) / (2*delta_x**2),
+    so dass die Ergebnisse mit der Eigenbasis und Crank-Nicolson (gleicher
+    Hamilton-Operator) vergleichbar sind. Mit kinetik="spektral" wird die
+    exakte Dispersion T(k) = hquer**2*k**2/2 verwendet (genauer fuer
+    schnelle Wellenpakete, weicht aber vom Gitter-Hamilton-Operator ab).
+
+    Parameter:
+        phi_0: Anfangswellenpaket auf dem Ortsgitter
+        x: Ortspunkte (aequidistant)
+        V: Potential V(x) bzw. V(x, t) falls `zeitabhaengig`
+        zeiten: aufsteigende Ausgabezeiten, zeiten[0] ist die Startzeit
+        hquer: effektives hquer
+        dt: maximale Zeitschrittweite
+        ordnung: 2 (Strang) oder 4 (Yoshida)
+        zeitabhaengig: gibt an, ob V von der Zeit abhaengt
+        kinetik: "3-Punkt" (Default, wie `qm.STENCIL`) oder "spektral"
+        blockgroesse: Anzahl der Zeiten pro Block
+    Rueckgabe (pro Block):
+        zeiten_block: Zeiten des Blocks
+        phi_block: phi(x, t) fuer diese Zeiten (Groesse N*len(zeiten_block))
+    """
+    if ordnung == 2:
+        gewichte = (1.0,)
+    elif ordnung == 4:
+        gewichte = (_YOSHIDA_W1, _YOSHIDA_W0, _YOSHIDA_W1)
+    else:
+        raise ValueError("ordnung muss 2 oder 4 sein")
+
+    delta_x = x[1] - x[0]
+    k = 2.0*np.pi * np.fft.fftfreq(len(x), d=delta_x)      # Wellenzahlen
+    if kinetik == "3-Punkt":
+        energie_k = hquer**2 * (2.0 - 2.0*np.cos(k*delta_x)) / (2.0*delta_x**2)
+    elif kinetik == "spektral":
+        energie_k = 0.5*hquer**2*k**2
+    else:
+        raise ValueError("kinetik muss '3-Punkt' oder 'spektral' sein")
+    return _bloecke(_split_operator_folge(phi_0, x, V, zeiten, hquer, dt,
+                                          gewichte, zeitabhaengig,
+                                          energie_k), blockgroesse)
+
+
+def _split_operator_folge(phi_0, x, V, zeiten, hquer, dt, gewichte,
+                          zeitabhaengig, energie_k):
+    """Generator der Split-Operator-Schritte, liefert (t, phi) pro
+    Ausgabezeit (siehe `split_operator_bloecke`).
+    """
+    v_werte = _potential_werte(V, x, zeiten[0], zeitabhaengig)
+    faktoren = {}                            # Phasenfaktoren je Schrittweite
+
+    def kinetisch(tau):
+        if tau not in faktoren:
+            faktoren[tau] = np.exp(-1j*energie_k*tau/hquer)
+        return faktoren[tau]
+
+    def potentiell(tau, v):
+        if zeitabhaengig:
+            return np.exp(-0.5j*v*tau/hquer)
+        schluessel = ("V", tau)
+        if schluessel not in faktoren:
+            faktoren[schluessel] = np.exp(-0.5j*v*tau/hquer)
+        return faktoren[schluessel]
+
+    phi = np.array(phi_0, dtype=complex)
+    yield zeiten[0], phi.copy()
+    for t, schritt, anz in _teilschritte(zeiten, dt):
+        for _i in range(anz):
+            for w in gewichte:
+                tau = w*schritt
+                phi *= potentiell(tau, v_werte)
+                phi = np.fft.ifft(kinetisch(tau) * np.fft.fft(phi))
+                t += tau
+                if zeitabhaengig:
+                    v_werte = V(x, t)
+                phi *= potentiell(tau, v_werte)
+        yield t, phi.copy()
+
+
+def split_operator(phi_0, x, V, zeiten, hquer, dt, ordnung=2,
+                   zeitabhaengig=False, kinetik=qm.STENCIL):
+    """Split-Operator-Propagation mit FFT fuer alle Ausgabezeiten.
+
+    Parameter und Verfahren wie bei `split_operator_bloecke`.
+    Rueckgabe:
+        phi_t: Wellenpaket phi(x, t), phi_t[:, j] zur Zeit zeiten[j]
+            (Groesse N*T, wie bei `zeitentwicklung`)
+    """
+    return np.hstack([phi_block for _zeiten, phi_block in
+                      split_operator_bloecke(phi_0, x, V, zeiten, hquer, dt,
+                                             ordnung, zeitabhaengig,
+                                             kinetik)])
+
+
+def hamilton_sparse(hquer, x, V, k=None):
+    """Baue den diskretisierten Hamilton-Operator als duenn besetzte Matrix.
+
+    Parameter:
+        hquer: effektives hquer
+        x: Ortspunkte
+        V: Potential als Funktion einer Variable
+        k: Bloch-Phase; None fuer Kasten mit Dirichlet-Rand, sonst komplexe
+            Eckelemente wie in 7_1 (psi(x + Periode) = exp(i*k)*psi(x))
+    Rueckgabe:
+        h: Hamilton-Operator (scipy.sparse, CSC-Format)
+    """
+    d, e = qm.hamilton_tridiagonal(hquer, x, V)
+    h = sparse.diags([e, d, e], [-1, 0, 1], format="lil",
+                     dtype=float if k is None else complex)
+    if k is not None:
+        h[0, -1] += e[0] * np.exp(-1j*k)                   # kompl. Eintraege
+        h[-1, 0] += e[0] * np.exp(+1j*k)                   # in den Ecken
+    return h.tocsc()
+
+
+def crank_nicolson_bloecke(phi_0, x, V, zeiten, hquer, dt, k=None,
+                           zeitabhaengig=False, blockgroesse=64):
+    """Crank-Nicolson-Propagation, liefert phi(x, t) blockweise als
+    Generator (wie `zeitentwicklung_bloecke`).
+
+    Pro Schritt wird
+        (1 + i*dt*H/(2*hquer)) phi_neu = (1 - i*dt*H/(2*hquer)) phi
+    geloest. Das Verfahren ist unitaer und unbedingt stabil. Die LU-Zerle-
+    gung der (bis auf die Bloch-Ecken) tridiagonalen Matrix kostet O(N) und
+    wird bei statischem Potential fuer jede Schrittweite nur einmal
+    berechnet; jeder Schritt kostet dann O(N). Bei zeitabhaengigem
+    Potential wird H in der Mitte jedes Schrittes ausgewertet.
+
+    Parameter:
+        phi_0: Anfangswellenpaket auf dem Ortsgitter
+        x: Ortspunkte (aequidistant)
+        V: Potential V(x) bzw. V(x, t) falls `zeitabhaengig`
+        zeiten: aufsteigende Ausgabezeiten, zeiten[0] ist die Startzeit
+        hquer: effektives hquer
+        dt: maximale Zeitschrittweite
+        k: Bloch-Phase (None: Kasten mit Dirichlet-Rand)
+        zeitabhaengig: gibt an, ob V von der Zeit abhaengt
+        blockgroesse: Anzahl der Zeiten pro Block
+    Rueckgabe (pro Block):
+        zeiten_block: Zeiten des Blocks
+        phi_block: phi(x, t) fuer diese Zeiten (Groesse N*len(zeiten_block))
+    """
+    return _bloecke(_crank_nicolson_folge(phi_0, x, V, zeiten, hquer, dt, k,
+                                          zeitabhaengig), blockgroesse)
+
+
+def _crank_nicolson_folge(phi_0, x, V, zeiten, hquer, dt, k, zeitabhaengig):
+    """Generator der Crank-Nicolson-Schritte, liefert (t, phi) pro
+    Ausgabezeit (siehe `crank_nicolson_bloecke`).
+    """
+    eins = sparse.identity(len(x), format="csc")
+    zerlegungen = {}                         # LU-Zerlegung je Schrittweite
+
+    def schrittoperatoren(h, tau):
+        links = (eins + 0.5j*tau/hquer * h).tocsc()
+        rechts = (eins - 0.5j*tau/hquer * h).tocsr()
+        return splu(links, permc_spec="NATURAL"), rechts   # Bandstruktur
+
+    h = None if zeitabhaengig else hamilton_sparse(hquer, x, V, k)
+    phi = np.array(phi_0, dtype=complex)
+    yield zeiten[0], phi.copy()
+    for t, schritt, anz in _teilschritte(zeiten, dt):
+        for _i in range(anz):
+            if zeitabhaengig:
+                t_mitte = t + 0.5*schritt
+                h_t = hamilton_sparse(hquer, x, lambda y: V(y, t_mitte), k)
+                lu, rechts = schrittoperatoren(h_t, schritt)
+            else:
+                if schritt not in zerlegungen:
+                    zerlegungen[schritt] = schrittoperatoren(h, schritt)
+                lu, rechts = zerlegungen[schritt]
+            phi = lu.solve(rechts.dot(phi))
+            t += schritt
+        yield t, phi.copy()
+
+
+def crank_nicolson(phi_0, x, V, zeiten, hquer, dt, k=None,
+                   zeitabhaengig=False):
+    """Crank-Nicolson-Propagation fuer alle Ausgabezeiten.
+
+    Parameter und Verfahren wie bei `crank_nicolson_bloecke`.
+    Rueckgabe:
+        phi_t: Wellenpaket phi(x, t), phi_t[:, j] zur Zeit zeiten[j]
+            (Groesse N*T, wie bei `zeitentwicklung`)
+    """
+    return np.hstack([phi_block for _zeiten, phi_block in
+                      crank_nicolson_bloecke(phi_0, x, V, zeiten, hquer, dt,
+                                             k, zeitabhaengig)])
+
+
+def beobachtungsgroessen_ort(phi_t, x, hquer, x_trenn=0.0):
+    """Berechne Erwartungswerte direkt aus phi(x, t) auf dem Ortsgitter.
+
+    Gegenstueck zu `beobachtungsgroessen` fuer die gitterbasierten Propa-
+    gatoren (gleiche Namen der Zeitreihen, Autokorrelation bzgl. phi_t[:, 0]).
+
+    Parameter:
+        phi_t: Wellenpaket phi(x, t), phi_t[:, j] zur j-ten Zeit
+        x: Ortspunkte
+        hquer: effektives hquer
+        x_trenn: Trennstelle der beiden Mulden
+    Rueckgabe:
+        reihen: dict mit den Zeitreihen "x", "x2", "p", "links", "rechts",
+            "norm" und "autokorrelation"
+    """
+    delta_x = x[1] - x[0]
+    dichte = np.abs(phi_t)**2
+    ableitung = np.zeros(phi_t.shape, dtype=complex)
+    ableitung[1:-1] = (phi_t[2:] - phi_t[:-2]) / (2.0*delta_x)
+    ableitung[0] = phi_t[1] / (2.0*delta_x)
+    ableitung[-1] = -phi_t[-2] / (2.0*delta_x)
+
+    links = x < x_trenn
+    return {"x": delta_x * np.dot(x, dichte),
+            "x2": delta_x * np.dot(x**2, dichte),
+            "p": np.real(-1j*hquer*delta_x *
+                         np.sum(np.conjugate(phi_t)*ableitung, axis=0)),
+            "links": delta_x * np.sum(dichte[links], axis=0),
+            "rechts": delta_x * np.sum(dichte[~links], axis=0),
+            "norm": delta_x * np.sum(dichte, axis=0),
+            "autokorrelation": delta_x * np.dot(np.conjugate(phi_t[:, 0]),
+                                                phi_t)}